@@ -0,0 +1,1062 @@
+# Sorting algorithms shared by the visualizers (viz_final.py, testing.py).
+#
+# The algorithms don't yield a copy of the whole array on every step anymore.
+# Instead they sort the array in place and yield small "events" that say what
+# they just did. A viewer keeps its own copy of the array and applies the events
+# to it, so every step costs O(1) instead of O(n). The array can be a list or a
+# NumPy array (see arrays.py), the algorithms only index and assign.
+#
+#   (COMPARE, i, j)      arr[i] was compared with arr[j]
+#   (SWAP, i, j)         arr[i] and arr[j] were swapped
+#   (WRITE, i, value)    value was written into arr[i]
+#   (DEPTH, d, 0)        the algorithm is d levels deep (in its recursion or its own stack)
+#   (AUX, size, 0)       the algorithm holds size elements outside the array
+# Only SWAP and WRITE change the array. DEPTH and AUX are there for the operation
+# counters (counters.py) and are rare, at most one per partition or merge pass.
+from collections import namedtuple
+import heapq
+import itertools
+import os
+
+
+# ---------------------- Events ----------------------
+COMPARE = 0 # event codes, kept as small ints so they are cheap to store
+SWAP = 1
+WRITE = 2
+DEPTH = 3
+AUX = 4
+
+EVENT_NAMES = {COMPARE: 'compare', SWAP: 'swap', WRITE: 'write', DEPTH: 'depth', AUX: 'aux'}
+
+
+def apply_event(arr, event): # applies one event to the viewer's copy of the array
+    op, a, b = event
+    if op == SWAP:
+        arr[a], arr[b] = arr[b], arr[a]
+    elif op == WRITE:
+        arr[a] = b
+
+
+def changed_indices(event): # returns the indices of the array that an event modified
+    op, a, b = event
+    if op == SWAP:
+        return (a, b)
+    if op == WRITE:
+        return (a,)
+    return ()
+
+
+def snapshots(algo_func, arr, **kwargs): # adapter for the old behaviour: yields the array after every change
+    # a list is copied every time, a NumPy array is given out as a read-only view (no copy, only valid until the next one)
+    numpy = hasattr(arr, 'flags')
+    for op, _, _ in algo_func(arr, **kwargs):
+        if op == SWAP or op == WRITE:
+            if numpy:
+                view = arr.view()
+                view.flags.writeable = False
+                yield view
+            else:
+                yield arr.copy()
+
+
+def _copy_run(arr, lo, hi): # arr[lo:hi] as a list of its own (slicing a NumPy array gives a view that the merge would overwrite)
+    part = arr[lo:hi]
+    return part if isinstance(part, list) else part.tolist()
+
+
+# ---------------------- Algorithms ----------------------
+def insertion_sort(arr, key=None, lo=0, hi=None): # sorts arr[lo:hi] in place
+    if key is not None:
+        yield from _sort_by_key(insertion_sort, arr, key, lo=lo, hi=hi)
+        return
+    if hi is None:
+        hi = len(arr)
+    for i in range(lo + 1, hi):
+        value = arr[i]
+        j = i - 1
+        while j >= lo:
+            yield (COMPARE, j, j + 1) # compare arr[j] with the value being inserted
+            if not arr[j] > value:
+                break
+            arr[j + 1] = arr[j] # shift the bigger element one place to the right
+            yield (WRITE, j + 1, arr[j])
+            j -= 1
+        if j + 1 != i:
+            arr[j + 1] = value
+            yield (WRITE, j + 1, value)
+
+
+def merge_sort(arr, key=None, lo=0, hi=None): # sorts arr[lo:hi] in place
+    if key is not None:
+        yield from _sort_by_key(merge_sort, arr, key, lo=lo, hi=hi)
+        return
+    # bottom-up: merges runs of 1, then 2, 4, ... so there is no recursion and no chain of generators to resume
+    if hi is None:
+        hi = len(arr)
+    width = 1
+    while width < hi - lo:
+        yield (AUX, min(2 * width, hi - lo), 0) # the two runs of a merge are copied out while they are merged
+        for start in range(lo, hi - width, 2 * width):
+            mid, end = start + width, min(start + 2 * width, hi)
+            L, R = _copy_run(arr, start, mid), _copy_run(arr, mid, end)
+            i = j = 0
+            k = start
+            while i < len(L) and j < len(R):
+                yield (COMPARE, k, mid + j) # R[j] is still in place at mid + j
+                if L[i] <= R[j]: # <= takes from the left run on ties, so equal elements keep their order
+                    arr[k] = L[i]
+                    i += 1
+                else:
+                    arr[k] = R[j]
+                    j += 1
+                yield (WRITE, k, arr[k])
+                k += 1
+
+            while i < len(L):
+                arr[k] = L[i]
+                yield (WRITE, k, arr[k])
+                i += 1
+                k += 1
+
+            while j < len(R): # these are already in place, but the viewer still sees them written
+                arr[k] = R[j]
+                yield (WRITE, k, arr[k])
+                j += 1
+                k += 1
+        width *= 2
+
+
+def quick_sort(a, l=0, r=None, key=None):
+    if key is not None:
+        yield from _sort_by_key(quick_sort, a, key, l=l, r=r)
+        return
+    # an explicit stack instead of recursion. The pivot is the median of the first, middle and last element, and
+    # both scans of the partition stop at values equal to the pivot, so sorted input and many equal values still split
+    # in the middle. The smaller side is sorted first and the bigger one waits on the stack, so the stack never holds
+    # more than log2(n) ranges.
+    if r is None:
+        r = len(a) - 1
+    stack = [(l, r)]
+    while stack:
+        l, r = stack.pop()
+        while l < r:
+            yield (DEPTH, len(stack), 0) # ranges waiting on the stack, what the recursion depth used to be
+            j = yield from _partition(a, l, r) # the pivot ends up at a[j]
+            if j - l < r - j: # go on with the smaller side, the bigger one waits
+                stack.append((j + 1, r))
+                r = j - 1
+            else:
+                stack.append((l, j - 1))
+                l = j + 1
+
+
+def _partition(a, l, r): # splits a[l..r] around a median of three pivot, returns where the pivot ends up
+    # median of three: a[l], a[m] and a[r] are put in order, then the median is moved to a[l]
+    m = (l + r) // 2
+    for p, q in ((l, m), (l, r), (m, r)):
+        yield (COMPARE, p, q)
+        if a[q] < a[p]:
+            a[p], a[q] = a[q], a[p]
+            yield (SWAP, p, q)
+    if m != l:
+        a[l], a[m] = a[m], a[l]
+        yield (SWAP, l, m)
+
+    # i moves right over values < pivot, j moves left over values > pivot, then they are swapped
+    x = a[l]
+    i, j = l, r + 1
+    while True:
+        i += 1
+        while i < r:
+            yield (COMPARE, i, l) # the pivot stays at a[l] until the end
+            if not a[i] < x:
+                break
+            i += 1
+        j -= 1
+        while True:
+            yield (COMPARE, j, l)
+            if not a[j] > x: # stops at a[l] at the latest
+                break
+            j -= 1
+        if i >= j:
+            break
+        a[i], a[j] = a[j], a[i]
+        yield (SWAP, i, j)
+    if j != l:
+        a[l], a[j] = a[j], a[l] # the pivot goes to where it belongs
+        yield (SWAP, l, j)
+    return j
+
+
+# ---------------------- Hybrid Algorithms ----------------------
+# Tim Sort finds the runs that are already in order (reversing the descending
+# ones), makes short runs at least min_run long with binary insertion sort and
+# merges the runs on a stack, keeping the run lengths shrinking fast enough
+# that the merges stay balanced. A merge first skips the elements that are
+# already in place, and when one run keeps winning it gallops: it looks for how
+# far that run goes with an exponential search instead of one element at a
+# time. Sorted or nearly sorted input is a handful of runs and takes O(n).
+#
+# Intro Sort is the quick sort above with insertion sort for ranges of up to
+# INTRO_CUTOFF elements, and heap sort for a range once the partitions went
+# 2 * log2(n) levels deep, so the worst case is O(n log n).
+MIN_GALLOP = 7 # wins in a row before a merge starts galloping
+INTRO_CUTOFF = 16 # ranges this small are insertion sorted
+
+
+def _min_run(n): # runs are made at least this long, so n / min_run is a power of two or a bit less
+    r = 0
+    while n >= 64:
+        r |= n & 1
+        n >>= 1
+    return n + r
+
+
+def tim_sort(arr, key=None, lo=0, hi=None): # sorts arr[lo:hi] in place
+    if key is not None:
+        yield from _sort_by_key(tim_sort, arr, key, lo=lo, hi=hi)
+        return
+    if hi is None:
+        hi = len(arr)
+    min_run = _min_run(hi - lo)
+    runs = [] # [start, length] of the runs waiting to be merged
+    start = lo
+    while start < hi:
+        length = yield from _count_run(arr, start, hi)
+        if length < min_run:
+            forced = min(min_run, hi - start)
+            yield from _binary_insertion(arr, start, start + forced, start + length)
+            length = forced
+        runs.append([start, length])
+        yield (DEPTH, len(runs), 0) # runs waiting on the stack
+        yield from _merge_runs(arr, runs)
+        start += length
+    yield from _merge_runs(arr, runs, force=True)
+
+
+def _count_run(arr, lo, hi): # length of the run that starts at lo, a descending run is reversed first
+    if lo + 1 == hi:
+        return 1
+    end = lo + 1 # last index of the run
+    yield (COMPARE, end, lo)
+    descending = arr[end] < arr[lo] # strictly, so reversing it can't change the order of equal elements
+    while end + 1 < hi:
+        yield (COMPARE, end + 1, end)
+        if (arr[end + 1] < arr[end]) != descending:
+            break
+        end += 1
+    if descending:
+        i, j = lo, end
+        while i < j:
+            arr[i], arr[j] = arr[j], arr[i]
+            yield (SWAP, i, j)
+            i += 1
+            j -= 1
+    return end + 1 - lo
+
+
+def _binary_insertion(arr, lo, hi, start): # arr[lo:start] is sorted, inserts arr[start:hi] into it one by one
+    for i in range(start, hi):
+        value = arr[i]
+        left, right = lo, i
+        while left < right: # after the elements equal to value, so equal elements keep their order
+            m = (left + right) // 2
+            yield (COMPARE, i, m)
+            if value < arr[m]:
+                right = m
+            else:
+                left = m + 1
+        for k in range(i, left, -1):
+            arr[k] = arr[k - 1]
+            yield (WRITE, k, arr[k])
+        if left != i:
+            arr[left] = value
+            yield (WRITE, left, value)
+
+
+def _merge_runs(arr, runs, force=False): # merges runs on the stack until their lengths shrink fast enough (all of them if force)
+    while len(runs) > 1:
+        n = len(runs) - 2
+        if force:
+            if n > 0 and runs[n - 1][1] < runs[n + 1][1]:
+                n -= 1
+        elif (n > 0 and runs[n - 1][1] <= runs[n][1] + runs[n + 1][1]) or (n > 1 and runs[n - 2][1] <= runs[n - 1][1] + runs[n][1]):
+            if runs[n - 1][1] < runs[n + 1][1]:
+                n -= 1
+        elif runs[n][1] > runs[n + 1][1]:
+            break
+        start, length = runs[n]
+        yield from _gallop_merge(arr, start, start + length, start + length + runs[n + 1][1])
+        runs[n][1] += runs[n + 1][1]
+        del runs[n + 1]
+
+
+def _gallop(value, run, lo, hi, right, at, shift):
+    # how many elements of the sorted run[lo:hi] go before value: the ones <= value if right, the ones < value if not.
+    # Looks at run[lo], run[lo + 2], run[lo + 6], ... then searches the last gap. The events say value is at index at
+    # and run[p] at index p + shift of the array.
+    n = hi - lo
+    last, offset = 0, 1
+    while offset <= n:
+        yield (COMPARE, at, lo + offset - 1 + shift)
+        x = run[lo + offset - 1]
+        if (value < x) if right else not (x < value):
+            break
+        last = offset
+        offset = offset * 2 + 1
+    left, limit = last, min(offset - 1, n)
+    while left < limit:
+        m = (left + limit) // 2
+        yield (COMPARE, at, lo + m + shift)
+        x = run[lo + m]
+        if (value < x) if right else not (x < value):
+            limit = m
+        else:
+            left = m + 1
+    return left
+
+
+def _gallop_merge(arr, start, mid, end): # merges the sorted runs arr[start:mid] and arr[mid:end]
+    start += yield from _gallop(arr[mid], arr, start, mid, True, mid, 0) # left elements <= the first right one are in place
+    if start == mid:
+        return
+    end = mid + (yield from _gallop(arr[mid - 1], arr, mid, end, False, mid - 1, 0)) # and right elements >= the last left one
+    yield (AUX, mid - start, 0) # the left run is copied out, the right one is merged where it is
+    L = _copy_run(arr, start, mid)
+    i, j, k = 0, mid, start
+    while i < len(L) and j < end:
+        left_wins = right_wins = 0
+        while i < len(L) and j < end and left_wins < MIN_GALLOP and right_wins < MIN_GALLOP: # one element at a time
+            yield (COMPARE, k, j)
+            if arr[j] < L[i]: # ties take from the left run, so equal elements keep their order
+                arr[k] = arr[j]
+                j += 1
+                right_wins += 1
+                left_wins = 0
+            else:
+                arr[k] = L[i]
+                i += 1
+                left_wins += 1
+                right_wins = 0
+            yield (WRITE, k, arr[k])
+            k += 1
+        while i < len(L) and j < end: # galloping, until neither run wins by MIN_GALLOP or more
+            count = yield from _gallop(arr[j], L, i, len(L), True, j, k - i)
+            for _ in range(count):
+                arr[k] = L[i]
+                yield (WRITE, k, arr[k])
+                i += 1
+                k += 1
+            if i == len(L):
+                break
+            right = yield from _gallop(L[i], arr, j, end, False, k, 0)
+            for _ in range(right):
+                arr[k] = arr[j]
+                yield (WRITE, k, arr[k])
+                j += 1
+                k += 1
+            if count < MIN_GALLOP and right < MIN_GALLOP:
+                break
+    while i < len(L): # the rest of the right run is already in place
+        arr[k] = L[i]
+        yield (WRITE, k, arr[k])
+        i += 1
+        k += 1
+
+
+def intro_sort(a, l=0, r=None, key=None): # sorts a[l..r] in place
+    if key is not None:
+        yield from _sort_by_key(intro_sort, a, key, l=l, r=r)
+        return
+    if r is None:
+        r = len(a) - 1
+    stack = [(l, r, 2 * max(r - l + 1, 1).bit_length())] # (range, partitions left before heap sort takes over)
+    while stack:
+        l, r, depth = stack.pop()
+        while r - l >= INTRO_CUTOFF:
+            if depth == 0: # the pivots were bad too often, heap sort is O(n log n) whatever the input
+                yield from _heap_sort(a, l, r + 1)
+                break
+            depth -= 1
+            yield (DEPTH, len(stack), 0)
+            j = yield from _partition(a, l, r)
+            if j - l < r - j: # the smaller side first, like quick_sort
+                stack.append((j + 1, r, depth))
+                r = j - 1
+            else:
+                stack.append((l, j - 1, depth))
+                l = j + 1
+        else:
+            yield from insertion_sort(a, lo=l, hi=r + 1)
+
+
+def _heap_sort(a, lo, hi): # sorts a[lo:hi] in place with a max heap
+    n = hi - lo
+    for root in range(n // 2 - 1, -1, -1):
+        yield from _sift_down(a, lo, root, n)
+    for end in range(n - 1, 0, -1):
+        a[lo], a[lo + end] = a[lo + end], a[lo] # the biggest element goes behind the heap
+        yield (SWAP, lo, lo + end)
+        yield from _sift_down(a, lo, 0, end)
+
+
+def _sift_down(a, lo, root, n): # moves a[lo + root] down the heap a[lo:lo + n] until its children are smaller
+    while True:
+        child = 2 * root + 1
+        if child >= n:
+            return
+        if child + 1 < n:
+            yield (COMPARE, lo + child, lo + child + 1)
+            if a[lo + child] < a[lo + child + 1]:
+                child += 1
+        yield (COMPARE, lo + root, lo + child)
+        if not a[lo + root] < a[lo + child]:
+            return
+        a[lo + root], a[lo + child] = a[lo + child], a[lo + root]
+        yield (SWAP, lo + root, lo + child)
+        root = child
+
+
+# ---------------------- Integer Sorts ----------------------
+# Counting Sort and Radix Sort don't compare elements, they use the values (or
+# the keys, which have to be integers) as positions. Counting sort counts every
+# value and puts each element straight where its value starts: O(n + k) for k
+# different values, which beats the O(n log n) sorts on the small value ranges
+# the windows use. LSD radix sort does the same one digit at a time, starting
+# from the lowest, so k can be big: O(n * digits) with radix ** digits >= k.
+# Both are stable, so they use the key directly instead of _sort_by_key().
+RADIX = 10 # default base of the digits radix sort sorts by
+
+
+def counting_sort(arr, key=None, lo=0, hi=None): # sorts arr[lo:hi] in place
+    if hi is None:
+        hi = len(arr)
+    if hi - lo < 2:
+        return
+    values = _copy_run(arr, lo, hi)
+    keys = values if key is None else [key(v) for v in values]
+    smallest = min(keys)
+    counts = [0] * (max(keys) - smallest + 1)
+    yield (AUX, len(counts) + len(values), 0) # the counts and a copy of the values
+    for x in keys:
+        counts[x - smallest] += 1
+    position = lo
+    for d, count in enumerate(counts): # counts[d] becomes where the first element with that value goes
+        counts[d] = position
+        position += count
+    for v, x in zip(values, keys): # in their old order, so equal values keep it
+        p = counts[x - smallest]
+        counts[x - smallest] = p + 1
+        arr[p] = v
+        yield (WRITE, p, v)
+
+
+def radix_sort(arr, key=None, lo=0, hi=None, radix=RADIX): # sorts arr[lo:hi] in place, radix is the base of the digits
+    if radix < 2: # with radix 1 the digits never run out, with 0 there are none
+        raise ValueError("radix must be at least 2, got {}".format(radix))
+    if hi is None:
+        hi = len(arr)
+    if hi - lo < 2:
+        return
+    values = _copy_run(arr, lo, hi)
+    keys = values if key is None else [key(v) for v in values]
+    smallest = min(keys)
+    span = max(keys) - smallest # digits of key - smallest, so negative keys work too
+    yield (AUX, len(values) + radix, 0) # the values in their order after the last pass, and the counts
+    order = list(range(len(values))) # order[p] is the element at arr[lo + p]
+    shift = 1
+    while True:
+        digits = [(keys[i] - smallest) // shift % radix for i in order]
+        counts = [0] * radix
+        for d in digits:
+            counts[d] += 1
+        position = 0
+        for d, count in enumerate(counts):
+            counts[d] = position
+            position += count
+        placed = [0] * len(order)
+        for i, d in zip(order, digits): # a stable pass on this digit
+            p = counts[d]
+            counts[d] = p + 1
+            placed[p] = i
+            arr[lo + p] = values[i]
+            yield (WRITE, lo + p, values[i])
+        order = placed
+        shift *= radix
+        if shift > span:
+            break
+
+
+# ---------------------- Sorting by Key ----------------------
+# With a key function every algorithm sorts (key(value), index) pairs instead of
+# the values (decorate-sort-undecorate). The key is computed once per element
+# instead of on every comparison, and because no two pairs are equal the order
+# of elements with equal keys is kept, whichever algorithm is used.
+def _decorate(arr, key): # the values as a list, and (key, index) pairs for them
+    values = arr.tolist() if hasattr(arr, 'tolist') else list(arr)
+    return values, [(key(v), i) for i, v in enumerate(values)]
+
+
+def _sort_by_key(steps_func, arr, key, **bounds): # runs a step version on the pairs, and yields its events for arr
+    values, decorated = _decorate(arr, key)
+    for event in steps_func(decorated, **bounds):
+        op = event[0]
+        if op == WRITE: # the pair that was written stands for the value at its index
+            k, value = event[1], values[event[2][1]]
+            arr[k] = value
+            yield (WRITE, k, value)
+        else:
+            if op == SWAP:
+                a, b = event[1], event[2]
+                arr[a], arr[b] = arr[b], arr[a]
+            yield event
+
+
+def _sort_by_key_fast(fast_func, arr, key, **bounds):
+    values, decorated = _decorate(arr, key)
+    fast_func(decorated, **bounds)
+    arr[:] = [values[i] for _, i in decorated]
+
+
+# ---------------------- Fast Implementations ----------------------
+# The same algorithms without any events. These are what gets timed, the step
+# versions above spend most of their time in the generator machinery.
+def insertion_sort_fast(arr, key=None, lo=0, hi=None):
+    if key is not None:
+        return _sort_by_key_fast(insertion_sort_fast, arr, key, lo=lo, hi=hi)
+    if hi is None:
+        hi = len(arr)
+    for i in range(lo + 1, hi):
+        value = arr[i]
+        j = i - 1
+        while j >= lo and arr[j] > value:
+            arr[j + 1] = arr[j]
+            j -= 1
+        arr[j + 1] = value
+
+
+def merge_sort_fast(arr, key=None, lo=0, hi=None):
+    if key is not None:
+        return _sort_by_key_fast(merge_sort_fast, arr, key, lo=lo, hi=hi)
+    if hi is None:
+        hi = len(arr)
+    width = 1
+    while width < hi - lo:
+        for start in range(lo, hi - width, 2 * width):
+            mid, end = start + width, min(start + 2 * width, hi)
+            L, R = _copy_run(arr, start, mid), _copy_run(arr, mid, end)
+            i = j = 0
+            k = start
+            while i < len(L) and j < len(R):
+                if L[i] <= R[j]:
+                    arr[k] = L[i]
+                    i += 1
+                else:
+                    arr[k] = R[j]
+                    j += 1
+                k += 1
+            arr[k:end] = L[i:] if i < len(L) else R[j:] # whatever is left is already in order
+        width *= 2
+
+
+def quick_sort_fast(a, l=0, r=None, key=None):
+    if key is not None:
+        return _sort_by_key_fast(quick_sort_fast, a, key, l=l, r=r)
+    if r is None:
+        r = len(a) - 1
+    stack = [(l, r)]
+    while stack:
+        l, r = stack.pop()
+        while l < r:
+            j = _partition_fast(a, l, r)
+            if j - l < r - j:
+                stack.append((j + 1, r))
+                r = j - 1
+            else:
+                stack.append((l, j - 1))
+                l = j + 1
+
+
+def _partition_fast(a, l, r):
+    m = (l + r) // 2
+    for p, q in ((l, m), (l, r), (m, r)):
+        if a[q] < a[p]:
+            a[p], a[q] = a[q], a[p]
+    a[l], a[m] = a[m], a[l]
+    x = a[l]
+    i, j = l, r + 1
+    while True:
+        i += 1
+        while i < r and a[i] < x:
+            i += 1
+        j -= 1
+        while a[j] > x:
+            j -= 1
+        if i >= j:
+            break
+        a[i], a[j] = a[j], a[i]
+    a[l], a[j] = a[j], a[l]
+    return j
+
+
+def tim_sort_fast(arr, key=None, lo=0, hi=None):
+    if key is not None:
+        return _sort_by_key_fast(tim_sort_fast, arr, key, lo=lo, hi=hi)
+    if hi is None:
+        hi = len(arr)
+    min_run = _min_run(hi - lo)
+    runs = []
+    start = lo
+    while start < hi:
+        length = _count_run_fast(arr, start, hi)
+        if length < min_run:
+            forced = min(min_run, hi - start)
+            _binary_insertion_fast(arr, start, start + forced, start + length)
+            length = forced
+        runs.append([start, length])
+        _merge_runs_fast(arr, runs)
+        start += length
+    _merge_runs_fast(arr, runs, force=True)
+
+
+def _count_run_fast(arr, lo, hi):
+    if lo + 1 == hi:
+        return 1
+    end = lo + 1
+    descending = arr[end] < arr[lo]
+    while end + 1 < hi and (arr[end + 1] < arr[end]) == descending:
+        end += 1
+    if descending:
+        arr[lo:end + 1] = arr[lo:end + 1][::-1]
+    return end + 1 - lo
+
+
+def _binary_insertion_fast(arr, lo, hi, start):
+    for i in range(start, hi):
+        value = arr[i]
+        left, right = lo, i
+        while left < right:
+            m = (left + right) // 2
+            if value < arr[m]:
+                right = m
+            else:
+                left = m + 1
+        arr[left + 1:i + 1] = arr[left:i] # one slice assignment shifts them all
+        arr[left] = value
+
+
+def _merge_runs_fast(arr, runs, force=False):
+    while len(runs) > 1:
+        n = len(runs) - 2
+        if force:
+            if n > 0 and runs[n - 1][1] < runs[n + 1][1]:
+                n -= 1
+        elif (n > 0 and runs[n - 1][1] <= runs[n][1] + runs[n + 1][1]) or (n > 1 and runs[n - 2][1] <= runs[n - 1][1] + runs[n][1]):
+            if runs[n - 1][1] < runs[n + 1][1]:
+                n -= 1
+        elif runs[n][1] > runs[n + 1][1]:
+            break
+        start, length = runs[n]
+        _gallop_merge_fast(arr, start, start + length, start + length + runs[n + 1][1])
+        runs[n][1] += runs[n + 1][1]
+        del runs[n + 1]
+
+
+def _gallop_fast(value, run, lo, hi, right):
+    n = hi - lo
+    last, offset = 0, 1
+    while offset <= n:
+        x = run[lo + offset - 1]
+        if (value < x) if right else not (x < value):
+            break
+        last = offset
+        offset = offset * 2 + 1
+    left, limit = last, min(offset - 1, n)
+    while left < limit:
+        m = (left + limit) // 2
+        x = run[lo + m]
+        if (value < x) if right else not (x < value):
+            limit = m
+        else:
+            left = m + 1
+    return left
+
+
+def _gallop_merge_fast(arr, start, mid, end):
+    start += _gallop_fast(arr[mid], arr, start, mid, True)
+    if start == mid:
+        return
+    end = mid + _gallop_fast(arr[mid - 1], arr, mid, end, False)
+    L = _copy_run(arr, start, mid)
+    i, j, k = 0, mid, start
+    while i < len(L) and j < end:
+        left_wins = right_wins = 0
+        while i < len(L) and j < end and left_wins < MIN_GALLOP and right_wins < MIN_GALLOP:
+            if arr[j] < L[i]:
+                arr[k] = arr[j]
+                j += 1
+                right_wins += 1
+                left_wins = 0
+            else:
+                arr[k] = L[i]
+                i += 1
+                left_wins += 1
+                right_wins = 0
+            k += 1
+        while i < len(L) and j < end:
+            count = _gallop_fast(arr[j], L, i, len(L), True)
+            arr[k:k + count] = L[i:i + count] # a whole stretch in one slice assignment
+            i += count
+            k += count
+            if i == len(L):
+                break
+            right = _gallop_fast(L[i], arr, j, end, False)
+            arr[k:k + right] = arr[j:j + right]
+            j += right
+            k += right
+            if count < MIN_GALLOP and right < MIN_GALLOP:
+                break
+    arr[k:k + len(L) - i] = L[i:]
+
+
+def intro_sort_fast(a, l=0, r=None, key=None):
+    if key is not None:
+        return _sort_by_key_fast(intro_sort_fast, a, key, l=l, r=r)
+    if r is None:
+        r = len(a) - 1
+    stack = [(l, r, 2 * max(r - l + 1, 1).bit_length())]
+    while stack:
+        l, r, depth = stack.pop()
+        while r - l >= INTRO_CUTOFF:
+            if depth == 0:
+                _heap_sort_fast(a, l, r + 1)
+                break
+            depth -= 1
+            j = _partition_fast(a, l, r)
+            if j - l < r - j:
+                stack.append((j + 1, r, depth))
+                r = j - 1
+            else:
+                stack.append((l, j - 1, depth))
+                l = j + 1
+        else:
+            insertion_sort_fast(a, lo=l, hi=r + 1)
+
+
+def _heap_sort_fast(a, lo, hi):
+    n = hi - lo
+    for root in range(n // 2 - 1, -1, -1):
+        _sift_down_fast(a, lo, root, n)
+    for end in range(n - 1, 0, -1):
+        a[lo], a[lo + end] = a[lo + end], a[lo]
+        _sift_down_fast(a, lo, 0, end)
+
+
+def _sift_down_fast(a, lo, root, n):
+    while True:
+        child = 2 * root + 1
+        if child >= n:
+            return
+        if child + 1 < n and a[lo + child] < a[lo + child + 1]:
+            child += 1
+        if not a[lo + root] < a[lo + child]:
+            return
+        a[lo + root], a[lo + child] = a[lo + child], a[lo + root]
+        root = child
+
+
+def counting_sort_fast(arr, key=None, lo=0, hi=None):
+    if hi is None:
+        hi = len(arr)
+    if hi - lo < 2:
+        return
+    np = _numpy()
+    if key is None and np is not None: # counts with bincount and writes the result with repeat, no Python loop
+        part = np.asarray(arr[lo:hi])
+        smallest = part.min()
+        counts = np.bincount(part - smallest)
+        result = np.repeat(np.arange(smallest, smallest + len(counts), dtype=part.dtype), counts)
+        arr[lo:hi] = result if hasattr(arr, 'flags') else result.tolist()
+        return
+    values = _copy_run(arr, lo, hi)
+    keys = values if key is None else [key(v) for v in values]
+    smallest = min(keys)
+    counts = [0] * (max(keys) - smallest + 1)
+    for x in keys:
+        counts[x - smallest] += 1
+    position = lo
+    for d, count in enumerate(counts):
+        counts[d] = position
+        position += count
+    for v, x in zip(values, keys):
+        p = counts[x - smallest]
+        counts[x - smallest] = p + 1
+        arr[p] = v
+
+
+def radix_sort_fast(arr, key=None, lo=0, hi=None, radix=RADIX):
+    if radix < 2: # with radix 1 the digits never run out, with 0 there are none
+        raise ValueError("radix must be at least 2, got {}".format(radix))
+    if hi is None:
+        hi = len(arr)
+    if hi - lo < 2:
+        return
+    np = _numpy()
+    values = _copy_run(arr, lo, hi)
+    keys = values if key is None else [key(v) for v in values]
+    column = _int64_array(np, arr[lo:hi] if key is None else keys) if np is not None else None
+    if column is not None and int(column.max()) - int(column.min()) <= INT64_MAX:
+        # every pass is one stable argsort of the digits, which NumPy does as a radix sort for 16 bit ints.
+        # Keys that aren't integers or don't fit in an int64 take the loop below (which raises TypeError for floats)
+        keys = column - column.min() # a copy, arr itself is not touched
+        span = keys.max()
+        digit_type = np.uint16 if radix <= 1 << 16 else np.int64
+        order = np.arange(len(values))
+        shift = 1
+        while True:
+            digits = (keys[order] // shift % radix).astype(digit_type)
+            order = order[np.argsort(digits, kind='stable')]
+            shift *= radix
+            if shift > span:
+                break
+        if key is None and hasattr(arr, 'flags'):
+            arr[lo:hi] = arr[lo:hi][order]
+        else:
+            arr[lo:hi] = [values[i] for i in order.tolist()]
+        return
+    smallest = min(keys)
+    span = max(keys) - smallest
+    order = list(range(len(values)))
+    shift = 1
+    while True:
+        buckets = [[] for _ in range(radix)]
+        for i in order:
+            buckets[(keys[i] - smallest) // shift % radix].append(i)
+        order = [i for bucket in buckets for i in bucket]
+        shift *= radix
+        if shift > span:
+            break
+    arr[lo:hi] = [values[i] for i in order]
+
+
+def _numpy(): # NumPy if it is installed, only imported when a fast path needs it so importing this module stays quick
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+INT64_MAX = (1 << 63) - 1
+
+
+def _int64_array(np, values): # values as an int64 NumPy array, None if they aren't all integers or don't all fit in an int64
+    part = np.asarray(values)
+    if part.dtype.kind not in 'iu': # floats, bools, Python ints too big for NumPy (object)...
+        return None
+    if part.dtype.kind == 'u' and len(part) and int(part.max()) > INT64_MAX: # the cast would wrap them around
+        return None
+    return part.astype(np.int64, copy=False)
+
+
+# ---------------------- Parallel Merge Sort ----------------------
+# The array is split into one chunk per worker. Every chunk is merge sorted on
+# its own, then the output is split into as many equal parts and every worker
+# k-way merges the elements of all the chunks that end up in its part: the cut
+# in each chunk is found by rank, so every part has the same size whatever the
+# values are. The fast form does this with a process pool on two
+# multiprocessing.shared_memory int64 buffers (the data and the output): the
+# workers attach to them by name, only names and indices are pickled. Small
+# arrays, keys and values that aren't integers are merge sorted in this process,
+# the pool costs more than it saves there.
+# The steps form runs the workers' merge sorts and merges side by side (one
+# event from each in turn) so the animation shows them all progressing, and
+# worker_regions() gives the part of the array each worker owns, in both phases,
+# for coloring it.
+PARALLEL_CUTOFF = 1 << 17 # smaller arrays are sorted without the pool
+PARALLEL_STEP_WORKERS = 4 # workers shown by the animation, the same on every machine
+
+
+def worker_regions(n, workers=PARALLEL_STEP_WORKERS): # the (lo, hi) range of the array every worker sorts and then merges into
+    return [(w * n // workers, (w + 1) * n // workers) for w in range(workers)]
+
+
+def parallel_merge_sort(arr, key=None, workers=PARALLEL_STEP_WORKERS):
+    if key is not None:
+        yield from _sort_by_key(parallel_merge_sort, arr, key, workers=workers)
+        return
+    regions = worker_regions(len(arr), workers)
+    yield (AUX, len(arr), 0) # the chunk merges together, and then the copy of the sorted chunks
+    yield from _side_by_side(merge_sort(arr, lo=lo, hi=hi) for lo, hi in regions)
+    runs = [_copy_run(arr, lo, hi) for lo, hi in regions]
+    cuts = _merge_cuts(runs, [lo for lo, _ in regions] + [len(arr)])
+    yield from _side_by_side(_kway_merge(arr, runs, regions, cuts[w], cuts[w + 1], lo) for w, (lo, _) in enumerate(regions))
+
+
+def _side_by_side(generators): # one event from each generator in turn, like workers running at the same time
+    active = list(generators)
+    while active:
+        for generator in list(active):
+            event = next(generator, None)
+            if event is None:
+                active.remove(generator)
+            elif event[0] != AUX: # the chunks' own buffers are counted by the one AUX event above
+                yield event
+
+
+def _merge_cuts(runs, ranks):
+    # for every rank (increasing), how many elements of each sorted run are among the rank smallest of all of them.
+    # Equal elements count from the earlier runs first, so the k-way merges keep their order.
+    merged = heapq.merge(*[zip(run, itertools.repeat(c)) for c, run in enumerate(runs)], key=lambda pair: pair[0])
+    counts = [0] * len(runs)
+    cuts = []
+    taken = 0
+    for rank in ranks:
+        while taken < rank:
+            counts[next(merged)[1]] += 1
+            taken += 1
+        cuts.append(counts.copy())
+    return cuts
+
+
+def _kway_merge(arr, runs, regions, first, last, k): # merges runs[c][first[c]:last[c]] of every run into arr from k on
+    heads = list(first)
+    while True:
+        best = None
+        for c in range(len(runs)):
+            if heads[c] < last[c]:
+                if best is None:
+                    best = c
+                    continue
+                yield (COMPARE, regions[c][0] + heads[c], regions[best][0] + heads[best]) # where the elements were before the copy
+                if runs[c][heads[c]] < runs[best][heads[best]]: # ties stay with the earlier run
+                    best = c
+        if best is None:
+            return
+        arr[k] = runs[best][heads[best]]
+        yield (WRITE, k, arr[k])
+        heads[best] += 1
+        k += 1
+
+
+def parallel_merge_sort_fast(arr, key=None, workers=None):
+    np = _numpy()
+    workers = workers or os.cpu_count() or 1
+    if key is not None or np is None or workers == 1 or len(arr) < PARALLEL_CUTOFF:
+        return merge_sort_fast(arr, key=key)
+    values = _int64_array(np, arr)
+    if values is None: # only integers that fit in an int64 go in the buffers, uint64 ones above that would wrap around
+        return merge_sort_fast(arr)
+    from multiprocessing import shared_memory
+
+    n = len(values)
+    regions = worker_regions(n, workers)
+    source = shared_memory.SharedMemory(create=True, size=n * 8)
+    output = shared_memory.SharedMemory(create=True, size=n * 8)
+    try:
+        data = np.ndarray(n, dtype=np.int64, buffer=source.buf)
+        data[:] = values
+        pool = _pool(workers)
+        list(pool.map(_sort_chunk, [(source.name, n, lo, hi) for lo, hi in regions]))
+        chunks = [data[lo:hi] for lo, hi in regions]
+        cuts = [_rank_cuts(np, chunks, lo) for lo, _ in regions] + [[len(chunk) for chunk in chunks]]
+        list(pool.map(_merge_part, [(source.name, output.name, n, regions, cuts[w], cuts[w + 1], lo)
+                                    for w, (lo, _) in enumerate(regions)]))
+        result = np.ndarray(n, dtype=np.int64, buffer=output.buf)
+        arr[:] = result if hasattr(arr, 'flags') else result.tolist()
+        del data, chunks, result # the buffers can't be closed while NumPy arrays still point into them
+    finally:
+        source.close()
+        source.unlink()
+        output.close()
+        output.unlink()
+
+
+def _rank_cuts(np, chunks, rank): # like _merge_cuts for one rank, by binary search on the values of sorted int arrays
+    if rank == 0:
+        return [0] * len(chunks)
+    low = min(int(chunk[0]) for chunk in chunks if len(chunk))
+    high = max(int(chunk[-1]) for chunk in chunks if len(chunk))
+    while low < high: # the smallest value with at least rank elements <= it
+        middle = (low + high) // 2
+        if sum(int(np.searchsorted(chunk, middle, 'right')) for chunk in chunks) >= rank:
+            high = middle
+        else:
+            low = middle + 1
+    lefts = [int(np.searchsorted(chunk, low, 'left')) for chunk in chunks]
+    need = rank - sum(lefts) # elements equal to low that still belong before the cut, from the earlier chunks first
+    cuts = []
+    for chunk, left in zip(chunks, lefts):
+        take = min(int(np.searchsorted(chunk, low, 'right')) - left, need)
+        cuts.append(left + take)
+        need -= take
+    return cuts
+
+
+_pools = {} # workers -> process pool, kept so only the first sort pays for starting the processes
+
+
+def _pool(workers):
+    if workers not in _pools:
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        # forkserver starts the workers from a clean process, forking a GUI with threads running can deadlock
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _pools[workers] = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method))
+    return _pools[workers]
+
+
+def _attach(name): # opens a shared memory block made by the parent, which unlinks it once the sort is done
+    from multiprocessing import shared_memory
+    return shared_memory.SharedMemory(name=name) # the workers share the parent's resource tracker, so this registers nothing new
+
+
+def _sort_chunk(task): # runs in a worker: merge sorts data[lo:hi] of the shared buffer
+    name, n, lo, hi = task
+    np = _numpy()
+    block = _attach(name)
+    try:
+        data = np.ndarray(n, dtype=np.int64, buffer=block.buf)
+        chunk = data[lo:hi].tolist()
+        merge_sort_fast(chunk)
+        data[lo:hi] = chunk
+        del data
+    finally:
+        block.close()
+
+
+def _merge_part(task): # runs in a worker: k-way merges its part of every sorted chunk into the output buffer
+    source_name, output_name, n, regions, first, last, start = task
+    np = _numpy()
+    source, output = _attach(source_name), _attach(output_name)
+    try:
+        data = np.ndarray(n, dtype=np.int64, buffer=source.buf)
+        out = np.ndarray(n, dtype=np.int64, buffer=output.buf)
+        runs = [data[lo + a:lo + b].tolist() for (lo, _), a, b in zip(regions, first, last)]
+        merged = list(heapq.merge(*runs))
+        out[start:start + len(merged)] = merged
+        del data, out
+    finally:
+        source.close()
+        output.close()
+
+
+# ---------------------- Registry ----------------------
+# Every algorithm comes in two forms: steps yields events for the animations,
+# fast just sorts and is used for timing. The windows build their combo boxes
+# and charts from this, so a new algorithm only has to be added here. regions,
+# if there is one, gives the part of the array each worker of the algorithm
+# owns (see worker_regions), so a viewer can color them apart.
+SortingAlgorithm = namedtuple('SortingAlgorithm', ['steps', 'fast', 'regions'], defaults=[None])
+
+
+ALGORITHMS = {
+    'Insertion Sort': SortingAlgorithm(insertion_sort, insertion_sort_fast),
+    'Merge Sort': SortingAlgorithm(merge_sort, merge_sort_fast),
+    'Quick Sort': SortingAlgorithm(quick_sort, quick_sort_fast),
+    'Tim Sort': SortingAlgorithm(tim_sort, tim_sort_fast),
+    'Intro Sort': SortingAlgorithm(intro_sort, intro_sort_fast),
+    'Counting Sort': SortingAlgorithm(counting_sort, counting_sort_fast),
+    'Radix Sort': SortingAlgorithm(radix_sort, radix_sort_fast),
+    'Parallel Merge Sort': SortingAlgorithm(parallel_merge_sort, parallel_merge_sort_fast, worker_regions),
+}
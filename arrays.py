@@ -0,0 +1,50 @@
+# The array a run works on can be a plain list or a NumPy int32 buffer.
+#
+# With NumPy the values sit in one flat block of memory (4 bytes each instead
+# of a pointer to an int object), a random array is made by one vectorized call
+# instead of a Python loop, snapshots of it (algorithms.snapshots) are
+# read-only views instead of copies, and PainterBarCanvas and BlitBarRenderer
+# compute the heights of their pixel columns with vectorized reductions. The
+# algorithms and the viewers work with either kind, NumPy is optional and
+# everything falls back to lists without it.
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+def is_numpy(arr): # True for a NumPy array
+    return np is not None and isinstance(arr, np.ndarray)
+
+
+def random_array(n, max_value=50, use_numpy=False, seed=None): # n random values from 0 to max_value
+    if use_numpy:
+        return np.random.default_rng(seed).integers(0, max_value + 1, size=n, dtype=np.int32)
+    rng = random.Random(seed)
+    return [rng.randint(0, max_value) for _ in range(n)]
+
+
+def column_maxima(arr, count, columns=None):
+    # splits a NumPy array into count buckets (bucket c is arr[c * n // count:(c + 1) * n // count])
+    # and returns the biggest value of every bucket in columns (all of them if None)
+    return _reduce_columns(np.maximum, arr, count, columns)
+
+
+def column_minima(arr, count, columns=None): # same as column_maxima with the smallest value of every bucket
+    return _reduce_columns(np.minimum, arr, count, columns)
+
+
+# ---------------------- Helper Functions ----------------------
+def _reduce_columns(ufunc, arr, count, columns):
+    n = len(arr)
+    if columns is None:
+        return ufunc.reduceat(arr, np.arange(count) * n // count)
+    lo = columns * n // count
+    lengths = (columns + 1) * n // count - lo
+    starts = np.cumsum(lengths) - lengths # where every bucket begins once they are put back to back
+    positions = np.arange(lengths.sum()) + np.repeat(lo - starts, lengths) # the indices of all their elements
+    return ufunc.reduceat(arr[positions], starts)
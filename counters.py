@@ -0,0 +1,53 @@
+# Counting the work an algorithm does, independently of how fast it is animated.
+#
+# The counter is fed the events the algorithm yields: comparisons, swaps and
+# writes are counted, DEPTH and AUX events keep the deepest recursion level and
+# the most extra elements held at once. pacing.advance() and SortWorker count
+# inside the loops they already run over the events (one list increment per
+# event), so the counters can stay on for big runs.
+from algorithms import COMPARE, SWAP, WRITE, DEPTH, EVENT_NAMES
+
+
+class OperationCounter:
+    def __init__(self):
+        self.counts = [0] * len(EVENT_NAMES) # events seen so far, indexed by event code
+        self.max_depth = 0 # deepest recursion level
+        self.aux_memory = 0 # most elements held outside the array at once
+
+    def count(self, event): # counts one event, for code that takes the events one at a time
+        op, a, _ = event
+        self.counts[op] += 1
+        if op > WRITE:
+            self.peak(op, a)
+
+    def peak(self, op, value): # a DEPTH or AUX event
+        if op == DEPTH:
+            if value > self.max_depth:
+                self.max_depth = value
+        elif value > self.aux_memory:
+            self.aux_memory = value
+
+    @property
+    def comparisons(self):
+        return self.counts[COMPARE]
+
+    @property
+    def swaps(self):
+        return self.counts[SWAP]
+
+    @property
+    def writes(self): # element writes, a swap writes two elements
+        return self.counts[WRITE] + 2 * self.counts[SWAP]
+
+    def as_dict(self):
+        return {
+            'comparisons': self.comparisons,
+            'swaps': self.swaps,
+            'writes': self.writes,
+            'aux_memory': self.aux_memory,
+            'max_depth': self.max_depth,
+        }
+
+    def summary(self): # one line for a label
+        return "comparisons: {:,}  swaps: {:,}  writes: {:,}  aux memory: {:,}  max depth: {}".format(
+            self.comparisons, self.swaps, self.writes, self.aux_memory, self.max_depth)
@@ -0,0 +1,179 @@
+# Exporting a recorded run (a sort_trace.py file) as an animation.
+#
+# The frames are drawn with matplotlib's Agg backend on a Figure that is never
+# shown, so this works on a server without a display. The frames to draw are
+# split into contiguous ranges of steps and every range is drawn by a process
+# of a pool: it gets the array at the start of its range, reads only the trace
+# chunks its range needs and draws its frames with a BlitBarRenderer (so only
+# the bars that changed since the last frame are drawn again). More cores means
+# more ranges drawn at once. The frames come back in order and are written as
+#   out.gif        an animated GIF (Pillow, which matplotlib already needs)
+#   out/           a directory of PNG files, written by the workers themselves
+#   out.mp4 ...    any other extension is piped to ffmpeg, if it is installed
+#
+#   python sort_trace.py record --algorithm "Merge Sort" --size 2000 run.trace
+#   python export.py run.trace merge.gif --frames 300 --fps 30 --title "Merge Sort"
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+import argparse
+import os
+import shutil
+import subprocess
+
+from algorithms import SWAP, WRITE, apply_event
+from sort_trace import TraceReader
+
+FRAMES_PER_TASK = 16 # frames drawn by one task, small enough to keep every worker busy until the end
+
+
+def frame_steps(steps, frames): # the steps the frames are taken at, from the first array to the sorted one
+    if frames < 2 or steps == 0:
+        return [steps]
+    return sorted({round(k * steps / (frames - 1)) for k in range(frames)})
+
+
+def output_kind(output): # 'gif', 'png' (a directory of PNGs) or 'video' (piped to ffmpeg)
+    extension = os.path.splitext(output)[1].lower()
+    if extension == '.gif':
+        return 'gif'
+    if extension == '':
+        return 'png'
+    return 'video'
+
+
+def export(trace_path, output, frames=300, fps=30, size=(8, 4), dpi=100, title="", workers=None):
+    # draws frames of the run in trace_path and writes them to output, returns the number of frames
+    kind = output_kind(output)
+    ffmpeg = shutil.which('ffmpeg')
+    if kind == 'video' and ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found, export to a .gif or a directory of PNGs instead")
+    if kind == 'png':
+        os.makedirs(output, exist_ok=True)
+
+    with TraceReader(trace_path) as reader:
+        steps = frame_steps(reader.steps, frames)
+        ranges = [steps[i:i + FRAMES_PER_TASK] for i in range(0, len(steps), FRAMES_PER_TASK)]
+        starts = _arrays_at(reader, [r[0] for r in ranges])
+    tasks = [(trace_path, r, start, i * FRAMES_PER_TASK, kind, output, size, dpi, title)
+             for i, (r, start) in enumerate(zip(ranges, starts))]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1: # no pool, the frames are drawn in this process
+        results = map(_render_range, tasks)
+        _write(kind, output, results, fps, size, dpi, ffmpeg)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            _write(kind, output, pool.map(_render_range, tasks), fps, size, dpi, ffmpeg) # map gives the ranges back in order
+    return len(steps)
+
+
+# ---------------------- Helper Functions ----------------------
+def _arrays_at(reader, steps): # the array after each of the (increasing) steps, one pass over the trace
+    frame = reader.initial()
+    arrays = []
+    step = 0
+    wanted = iter(steps)
+    target = next(wanted, None)
+    events = reader.events()
+    while target is not None:
+        if step == target:
+            arrays.append(frame.copy())
+            target = next(wanted, None)
+            continue
+        apply_event(frame, next(events))
+        step += 1
+    return arrays
+
+
+def _events_from(reader, step): # the recorded events from step on, without reading the chunks before it
+    first = 0
+    for index, (_, _, records) in enumerate(reader.chunks):
+        if first + records > step:
+            events = reader.events(index)
+            for _ in range(step - first):
+                next(events)
+            return events
+        first += records
+    return reader.events(len(reader.chunks)) # no events left, still a generator so it can be closed
+
+
+def _render_range(task): # runs in a worker: draws the frames of one range of steps
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from PIL import Image
+    from renderers import BlitBarRenderer
+
+    trace_path, steps, frame, first_frame, kind, output, size, dpi, title = task
+    figure = Figure(figsize=size, dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    renderer = BlitBarRenderer(figure, canvas)
+    renderer.reset(frame, title)
+    results = []
+    with TraceReader(trace_path) as reader, closing(_events_from(reader, steps[0])) as events: # the events stop reading before the reader closes
+        step = steps[0]
+        for number, target in enumerate(steps, first_frame):
+            dirty = set()
+            while step < target:
+                op, a, b = event = next(events)
+                apply_event(frame, event)
+                if op == SWAP:
+                    dirty.update((a, b))
+                elif op == WRITE:
+                    dirty.add(a)
+                step += 1
+            renderer.update(frame, dirty) # Agg has no screen, the redrawn bars go straight into its buffer
+            renderer.set_text("step {:,}".format(step))
+            image = Image.frombuffer('RGBA', canvas.get_width_height(), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).convert('RGB')
+            if kind == 'png':
+                image.save(os.path.join(output, 'frame_{:06d}.png'.format(number)))
+            elif kind == 'gif':
+                results.append(image.quantize(64)) # the palette is made here too, in parallel
+            else:
+                results.append(image.tobytes())
+    return results
+
+
+def _write(kind, output, results, fps, size, dpi, ffmpeg): # writes the drawn frames as they come back from the workers
+    if kind == 'png':
+        for _ in results: # the workers saved the files, just wait for them
+            pass
+    elif kind == 'gif':
+        images = [image for frames in results for image in frames]
+        images[0].save(output, save_all=True, append_images=images[1:], duration=round(1000 / fps), loop=0)
+    else:
+        width, height = int(size[0] * dpi), int(size[1] * dpi) # the same rounding as the Agg canvas
+        command = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '{}x{}'.format(width, height),
+                   '-r', str(fps), '-i', '-', '-pix_fmt', 'yuv420p', output]
+        with subprocess.Popen(command, stdin=subprocess.PIPE) as process:
+            for frames in results:
+                for data in frames:
+                    process.stdin.write(data)
+            process.stdin.close()
+        if process.returncode:
+            raise RuntimeError("ffmpeg failed with exit code {}".format(process.returncode))
+
+
+# ---------------------- Command Line ----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a recorded sorting run as a GIF, a video or PNG files.")
+    parser.add_argument('trace', help="trace file made with sort_trace.py record")
+    parser.add_argument('output', help="out.gif, out.mp4 (needs ffmpeg) or a directory for PNG files")
+    parser.add_argument('--frames', type=int, default=300, help="number of frames, spread evenly over the steps")
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--width', type=float, default=8, help="inches")
+    parser.add_argument('--height', type=float, default=4, help="inches")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--title', default="")
+    parser.add_argument('--workers', type=int, default=None, help="processes drawing frames (default: one per core)")
+    args = parser.parse_args(argv)
+
+    try:
+        count = export(args.trace, args.output, frames=args.frames, fps=args.fps, size=(args.width, args.height),
+                       dpi=args.dpi, title=args.title, workers=args.workers)
+    except RuntimeError as error: # no ffmpeg
+        parser.error(str(error))
+    print("wrote {} frames to {}".format(count, args.output))
+
+
+if __name__ == "__main__":
+    main()
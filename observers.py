@@ -0,0 +1,224 @@
+# Observers: hooks that watch a sort run from the inside.
+#
+# All a window used to show about a run was the time it took. An observer is
+# told when a run starts and finishes, when the algorithm's own code runs
+# (resume / suspend) and, if it asks for it, how long every step took. The
+# runners that call the hooks are observe() for the step generators (MainWindow,
+# on the GUI thread or the worker thread) and bench.time_algorithm() for the
+# fast functions (RunningTimesWindow). With no observers both run exactly as
+# before, observe() gives back the generator itself and time_algorithm() has
+# nothing inside its clock, so the hooks can stay wired into every run.
+#
+#   CProfileObserver     the functions the time went to, export() writes a pstats file
+#   TracemallocObserver  the peak memory of a run and the lines holding the most memory at its end
+#   StepLatencyObserver  a histogram of the time every step took
+#
+#   observers = [CProfileObserver(), StepLatencyObserver()]
+#   for event in observe(merge_sort(arr), observers, "Merge Sort"): ...
+#   print(observers[0].report())
+from array import array
+import cProfile
+import math
+import os
+import pstats
+import time
+import tracemalloc
+
+
+class Observer: # every hook does nothing, an observer overrides the ones it needs
+    times_steps = False # True asks the runner to time every step and call step(), two clock reads per step
+
+    def started(self, name): # a run of the algorithm called name starts
+        pass
+
+    def resume(self): # the algorithm's code runs on this thread from now on...
+        pass
+
+    def suspend(self): # ...until now
+        pass
+
+    def step(self, seconds): # the time of one step of a generator, or of one timed call of a fast function
+        pass
+
+    def finished(self): # the run is over, or was dropped before the end
+        pass
+
+    def report(self): # a few lines about what was seen, "" if nothing was
+        return ""
+
+
+class CProfileObserver(Observer):
+    def __init__(self, top=10):
+        self.profile = cProfile.Profile() # only enabled while the algorithm runs, kept over all the runs it sees
+        self.top = top # functions shown by report()
+        self.runs = 0
+
+    def started(self, name):
+        self.runs += 1
+
+    def resume(self):
+        self.profile.enable()
+
+    def suspend(self):
+        self.profile.disable()
+
+    def report(self): # the functions that took the most time themselves, not counting what they called
+        self.profile.create_stats()
+        if not self.profile.stats:
+            return ""
+        rows = [(key, stat) for key, stat in self.profile.stats.items() if not _watching(key, stat[4])]
+        rows = sorted(rows, key=lambda item: item[1][2], reverse=True)[:self.top]
+        lines = ["{:>10} own {:>10} total {:>9,} calls  {}".format(_duration(own), _duration(total), calls, _function(key))
+                 for key, (_, calls, own, total, _) in rows]
+        return "\n".join(lines)
+
+    def export(self, path): # writes the stats as a pstats file, for `python -m pstats path` or snakeviz
+        pstats.Stats(self.profile).dump_stats(path)
+
+
+class TracemallocObserver(Observer):
+    watching = 0 # runs being watched by any TracemallocObserver, tracemalloc is on while there is one
+
+    def __init__(self, top=5):
+        self.top = top # allocation sites shown by report()
+        self.name = ""
+        self.peak = 0 # the biggest peak of the runs seen, in bytes
+        self.peak_name = "" # the run it was in
+        self.snapshot = None # the memory still held at the end of that run
+        self.running = False
+
+    def started(self, name):
+        self.name = name
+        self.running = True
+        TracemallocObserver.watching += 1
+        if not tracemalloc.is_tracing(): # slows every allocation down, so it only runs while a run is watched
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    def finished(self):
+        if not self.running:
+            return
+        self.running = False
+        TracemallocObserver.watching -= 1
+        peak = tracemalloc.get_traced_memory()[1]
+        if peak >= self.peak:
+            self.peak, self.peak_name = peak, self.name
+            self.snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        if not TracemallocObserver.watching: # a run dropped late (e.g. by its worker thread) doesn't stop the next run's tracing
+            tracemalloc.stop()
+
+    def report(self):
+        if self.snapshot is None:
+            return ""
+        lines = ["peak {} during {}".format(_size(self.peak), self.peak_name)]
+        for stat in self.snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            lines.append("{:>10} in {:>7,} blocks  {}:{}".format(_size(stat.size), stat.count, os.path.basename(frame.filename), frame.lineno))
+        return "\n".join(lines)
+
+
+class StepLatencyObserver(Observer):
+    times_steps = True
+
+    def __init__(self):
+        self.buckets = array('q', [0] * 64) # bucket b counts the steps that took less than 2^b ns (and at least 2^(b-1))
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+
+    def step(self, seconds):
+        self.buckets[int(seconds * 1e9).bit_length()] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.slowest:
+            self.slowest = seconds
+
+    def percentile(self, p): # an upper bound (the end of its bucket) of the p percentile of the step times, p from 0 to 100
+        rank = max(math.ceil(p / 100 * self.count), 1)
+        seen = 0
+        for b, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min((1 << b) / 1e9, self.slowest)
+        return self.slowest
+
+    def report(self):
+        if not self.count:
+            return ""
+        lines = ["{:,} steps, mean {}, p50 < {}, p99 < {}, max {}".format(self.count, _duration(self.total / self.count),
+                 _duration(self.percentile(50)), _duration(self.percentile(99)), _duration(self.slowest))]
+        widest = max(self.buckets)
+        for b, count in enumerate(self.buckets):
+            if count:
+                lines.append("< {:>8} {:<30} {:,}".format(_duration((1 << b) / 1e9), '#' * max(round(30 * count / widest), 1), count))
+        return "\n".join(lines)
+
+
+OBSERVERS = { # name shown in the windows -> observer class
+    'cProfile': CProfileObserver,
+    'tracemalloc': TracemallocObserver,
+    'Step latency': StepLatencyObserver,
+}
+
+
+def observe(generator, observers, name=""): # the events of generator, with the observers told about every step
+    if not observers:
+        return generator # nothing watches, the run is not slowed down at all
+    return _observed(generator, list(observers), name)
+
+
+# ---------------------- Helper Functions ----------------------
+def _observed(generator, observers, name):
+    timers = [observer for observer in observers if observer.times_steps]
+    clock = time.perf_counter
+    for observer in observers:
+        observer.started(name)
+    try:
+        while True:
+            for observer in observers:
+                observer.resume()
+            started = clock()
+            try:
+                event = next(generator)
+            except StopIteration:
+                return
+            finally:
+                seconds = clock() - started
+                for observer in observers:
+                    observer.suspend()
+            for observer in timers:
+                observer.step(seconds)
+            yield event
+    finally: # also when the run is dropped before the end (the generator is closed)
+        for observer in observers:
+            observer.finished()
+
+
+def _watching(key, callers): # True for the calls made by the runner itself: this module, the clock, next()...
+    if key[0] == __file__:
+        return True
+    if not callers: # called straight from the runner, which was entered before the profile was enabled
+        return key[0] == '~' # a built-in, the algorithm's own function is kept
+    return all(caller[0] == __file__ for caller in callers)
+
+
+def _duration(seconds): # 1.2 µs, 35.0 ms...
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return "{:.1f} {}".format(seconds / scale, unit)
+    return "{:.0f} ns".format(seconds * 1e9)
+
+
+def _size(size): # 512 B, 3.4 MiB...
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return "{:.0f} {}".format(size, unit) if unit == 'B' else "{:.1f} {}".format(size, unit)
+        size /= 1024
+    return "{:.1f} GiB".format(size)
+
+
+def _function(key): # merge_sort (algorithms.py:123), or the name of a built-in
+    filename, line, function = key
+    if filename == '~':
+        return function
+    return "{} ({}:{})".format(function, os.path.basename(filename), line)
@@ -0,0 +1,107 @@
+# Frame pacing for the MainWindow animations.
+#
+# The timer used to call next(generator) once per tick, so the animation could
+# never go faster than 1000 / interval steps per second. Now every tick of the
+# timer is one frame: advance() applies as many steps as the FramePacer allows
+# (a steps per second rate, and never more than a part of the frame time) and
+# the renderer draws once at the end with all the bars that changed.
+# A step is one change to the array (a swap or a write), comparisons are free.
+# Every event is also counted by the run's OperationCounter on the way.
+import math
+import time
+
+from algorithms import SWAP, WRITE, COMPARE
+from counters import OperationCounter
+from profiling import STEP, APPLY
+
+
+class FramePacer:
+    def __init__(self, target_fps=30, steps_per_second=0, budget=0.6):
+        self.target_fps = target_fps # how many frames we try to draw per second
+        self.steps_per_second = steps_per_second # 0 means as many steps as fit in the frame
+        self.budget = budget # part of the frame time that can be spent stepping, the rest is for drawing
+        self.credit = 0.0 # steps we are allowed to do but haven't done yet
+        self.last = time.perf_counter()
+
+    def interval_ms(self): # the timer interval for the target fps
+        return max(int(1000 / self.target_fps), 1)
+
+    def start(self): # call when the animation (re)starts so a pause doesn't build up steps
+        self.credit = 0.0
+        self.last = time.perf_counter()
+
+    def quota(self): # number of steps allowed this frame, None means no limit
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        if self.steps_per_second <= 0:
+            return None
+        self.credit = min(self.credit + elapsed * self.steps_per_second, self.steps_per_second * 0.25 + 1) # a slow frame can't cause a huge burst after it
+        steps = int(self.credit)
+        self.credit -= steps
+        return steps
+
+    def deadline(self): # when this frame has to stop stepping
+        return time.perf_counter() + self.budget / self.target_fps
+
+
+class FixedQuota: # allows the same number of steps every frame and never cuts a frame short, for lock-step races
+    def __init__(self, steps):
+        self.steps = steps
+
+    def quota(self):
+        return self.steps
+
+    def deadline(self):
+        return math.inf
+
+
+def advance(generator, frame, pacer, counter=None, profiler=None):
+    # applies the steps of one frame to frame, returns (changed indices, steps, finished)
+    # the generator is run first and the changes it made are applied after, so a FrameProfiler can time both apart
+    if counter is None:
+        counter = OperationCounter()
+    counts = counter.counts
+    quota = pacer.quota()
+    if quota == 0:
+        return set(), 0, False
+    deadline = pacer.deadline()
+    clock = time.perf_counter
+    started = clock()
+    changes = []
+    events = 0
+    finished = False
+    for event in generator:
+        op = event[0]
+        events += 1
+        counts[op] += 1
+        if op == SWAP or op == WRITE:
+            changes.append(event)
+            if len(changes) == quota:
+                break
+        elif op != COMPARE: # recursion depth or extra memory
+            counter.peak(op, event[1])
+        # comparisons don't change the array, they only count for the clock check
+        if events & 63 == 0 and clock() > deadline: # looking at the clock every step would cost more than the step
+            break
+    else:
+        finished = True # the generator ran out
+    stepped = clock()
+    dirty = apply_changes(frame, changes)
+    if profiler is not None:
+        profiler.add(STEP, stepped - started)
+        profiler.add(APPLY, clock() - stepped)
+    return dirty, len(changes), finished
+
+
+def apply_changes(frame, changes): # applies a list of SWAP / WRITE events to frame, returns the changed indices
+    dirty = set()
+    for op, a, b in changes:
+        if op == SWAP:
+            frame[a], frame[b] = frame[b], frame[a]
+            dirty.add(a)
+            dirty.add(b)
+        else:
+            frame[a] = b
+            dirty.add(a)
+    return dirty
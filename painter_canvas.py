@@ -0,0 +1,182 @@
+# A bar chart widget that paints the array itself with QPainter.
+#
+# matplotlib needs one Rectangle artist per bar, which stops keeping up after a
+# few thousand bars. This widget has the same methods as BlitBarRenderer
+# (reset / update / set_text / detach) so MainWindow can use it in place of the
+# matplotlib canvas, but it just keeps the height of every pixel column (the
+# biggest value of the elements that land in that column) and fills one rect per
+# column. An update only recomputes the columns that changed and repaints their
+# part of the widget. When the array is a NumPy buffer the column heights are
+# computed in bulk. A list keeps a max segment tree over its elements, so a
+# column whose biggest element got smaller is found again in O(log n) instead of
+# rescanning the whole column in Python. Both keep arrays of 100k - 1M
+# elements animating, NumPy is still the faster of the two for the biggest ones.
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QPainter, QColor
+import time
+
+from arrays import is_numpy, column_maxima, np # NumPy arrays get their columns from vectorized reductions
+
+
+class PainterBarCanvas(QWidget):
+    MARGIN = 8 # pixels around the bars
+    TITLE_HEIGHT = 24 # pixels at the top for the title
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.arr = [] # the array that is drawn (the viewer's own copy, not copied again here)
+        self.columns = [] # height of every pixel column
+        self.tree = [] # max segment tree of a list array: tree[n + i] is arr[i], tree[j] the max of tree[2j] and tree[2j + 1]
+        self.y_max = 1
+        self.title = ""
+        self.text = ""
+        self.bar_color = QColor('blue')
+        self.colors = None # colour of every index, None draws every column in bar_color
+        self.column_colors = [] # colour of every pixel column when colors is given
+        self.text_color = QColor('#E4365D')
+        self.paint_seconds = 0.0 # time spent in paintEvent since the owner last reset it, for the FrameProfiler
+        self.setAttribute(Qt.WA_OpaquePaintEvent) # every paint fills its whole area, so Qt doesn't have to clear it first
+        self.setMinimumSize(200, 150)
+
+    def reset(self, arr, title="", xlabel="", ylabel="", colors=None): # starts drawing a new array (labels are not drawn by this canvas)
+        # colors gives every index its own colour (e.g. the region of a worker), a column takes the colour of its first index
+        self.arr = arr
+        self.colors = colors
+        self.title = title
+        self.text = ""
+        self.y_max = int(1.1 * (arr.max() if is_numpy(arr) and len(arr) else max(arr, default=0))) + 1
+        self._build_tree()
+        self._rebuild_columns()
+        self.update()
+
+    def detach(self): # nothing to give back, the widget doesn't share a figure with anything
+        pass
+
+    def update(self, arr=None, dirty=None): # redraws the columns of the elements at the indices in dirty
+        if arr is None: # plain QWidget.update(), e.g. called by Qt itself
+            return super().update()
+        self.arr = arr
+        if not dirty or not len(self.columns):
+            return
+        n = len(arr)
+        count = len(self.columns)
+        if len(dirty) * 4 > n: # most of the array changed (e.g. a jump on the timeline), rebuilding every column is cheaper
+            self._build_tree()
+            self._rebuild_columns()
+            return super().update()
+        if is_numpy(arr): # every changed column at once
+            changed = np.unique(((np.fromiter(dirty, dtype=np.int64, count=len(dirty)) + 1) * count - 1) // n)
+            self.columns[changed] = column_maxima(arr, count, changed)
+            first, last = int(changed[0]), int(changed[-1])
+        else:
+            changed = self._update_columns(arr, dirty)
+            first, last = min(changed), max(changed)
+        plot = self._plot_rect()
+        x0 = plot.left() + first * plot.width() // count
+        x1 = plot.left() + (last + 1) * plot.width() // count
+        super().update(QRect(x0, plot.top(), x1 - x0 + 1, plot.height() + 1)) # Qt merges these and paints once per frame
+
+    def set_text(self, s): # changes the text in the top left corner of the chart
+        self.text = s
+        plot = self._plot_rect()
+        super().update(QRect(plot.left(), plot.top(), plot.width() // 2, 20))
+
+    # ---------------------- Helper Functions ----------------------
+    def _update_columns(self, arr, dirty): # recomputes the columns of the indices in dirty, returns the columns
+        n = len(arr)
+        count = len(self.columns)
+        tree = self.tree
+        shrunk = set() # columns whose biggest element may have got smaller
+        changed = set()
+        for i in dirty:
+            value = arr[i]
+            j = i + n
+            tree[j] = value
+            j >>= 1
+            while j: # the path up to the root, stops early once a node doesn't change
+                biggest = max(tree[2 * j], tree[2 * j + 1])
+                if tree[j] == biggest:
+                    break
+                tree[j] = biggest
+                j >>= 1
+            c = ((i + 1) * count - 1) // n # the bucket that holds i, buckets start at c * n // count
+            if value >= self.columns[c]: # the column can only grow, no need to look at its other elements
+                self.columns[c] = value
+            else:
+                shrunk.add(c)
+            changed.add(c)
+        for c in shrunk:
+            self.columns[c] = self._range_max(c * n // count, (c + 1) * n // count)
+        return changed
+
+    def _build_tree(self): # the segment tree of a list array, NumPy arrays don't need one
+        if is_numpy(self.arr):
+            self.tree = []
+            return
+        n = len(self.arr)
+        tree = [0] * n + list(self.arr)
+        for j in range(n - 1, 0, -1):
+            tree[j] = max(tree[2 * j], tree[2 * j + 1])
+        self.tree = tree
+
+    def _range_max(self, lo, hi): # the biggest of arr[lo:hi] (not empty), from the segment tree
+        tree = self.tree
+        lo += len(self.arr)
+        hi += len(self.arr)
+        biggest = tree[lo]
+        while lo < hi:
+            if lo & 1:
+                biggest = max(biggest, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                biggest = max(biggest, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return biggest
+
+    def _plot_rect(self): # the part of the widget the bars are drawn in
+        return self.rect().adjusted(self.MARGIN, self.TITLE_HEIGHT, -self.MARGIN, -self.MARGIN)
+
+    def _rebuild_columns(self): # puts the elements into one bucket per pixel column (or one per element if there are fewer)
+        n = len(self.arr)
+        count = min(n, max(self._plot_rect().width(), 1))
+        if self.colors is not None:
+            self.column_colors = [QColor(self.colors[c * n // count]) for c in range(count)]
+        if is_numpy(self.arr):
+            self.columns = column_maxima(self.arr, count) if n else []
+            return
+        self.columns = [max(self.arr[c * n // count:(c + 1) * n // count]) for c in range(count)]
+
+    def resizeEvent(self, event):
+        self._rebuild_columns() # the number of pixel columns changed
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        area = event.rect()
+        painter.fillRect(area, Qt.white)
+
+        plot = self._plot_rect()
+        count = len(self.columns)
+        if count:
+            scale = plot.height() / self.y_max
+            width = plot.width()
+            gap = 0.2 if width // count >= 3 else 0 # same gaps as the matplotlib bars when there is room for them
+            first = max((area.left() - plot.left()) * count // width, 0)
+            last = min((area.right() - plot.left()) * count // width + 1, count - 1)
+            bottom = plot.bottom()
+            colors = self.column_colors if self.colors is not None else None
+            for c in range(first, last + 1):
+                x0 = plot.left() + c * width // count
+                x1 = plot.left() + (c + 1) * width // count
+                h = int(self.columns[c] * scale)
+                painter.fillRect(x0, bottom - h + 1, max(int((x1 - x0) * (1 - gap)), 1), h, self.bar_color if colors is None else colors[c])
+
+        painter.setPen(self.text_color)
+        painter.drawText(QRect(0, 0, self.width(), self.TITLE_HEIGHT), Qt.AlignCenter, self.title)
+        painter.drawText(QRect(plot.left() + 4, plot.top() + 2, plot.width() // 2, 20), Qt.AlignLeft | Qt.AlignTop, self.text)
+        painter.end()
+        self.paint_seconds += time.perf_counter() - started
@@ -0,0 +1,106 @@
+# Per-frame profiling of the animations.
+#
+# The "Total Execution Time" of a run used to be the wall time from start to
+# finish, which is mostly the timer waiting and the canvas drawing. The
+# FrameProfiler keeps, for every frame, the time spent in each stage:
+#   step    running the algorithm's generator (or taking batches from the worker)
+#   apply   applying the changes to the viewer's array
+#   draw    updating and painting the canvas
+# plus the number of steps done. stats() turns that into FPS, steps per second,
+# the p50 / p99 frame time and which stage the time went to, for the overlay,
+# and export() writes every frame and the summary to a JSON or CSV file.
+#
+#   profiler.start_frame()
+#   ... profiler.add(STEP, seconds) ... profiler.add(DRAW, seconds) ...
+#   profiler.end_frame(steps)
+from array import array
+import csv
+import json
+import math
+import time
+
+STEP = 0 # stages of a frame
+APPLY = 1
+DRAW = 2
+STAGE_NAMES = ['step', 'apply', 'draw']
+
+
+def percentile(values, p): # nearest rank percentile of a list of numbers, p from 0 to 100
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class FrameProfiler:
+    def __init__(self):
+        self.starts = array('d') # perf_counter() at the start of every frame
+        self.stages = [array('d') for _ in STAGE_NAMES] # seconds per stage, one entry per frame
+        self.steps = array('q') # steps done in every frame
+        self.current = [0.0] * len(STAGE_NAMES) # the frame being measured
+        self.frame_start = None
+
+    def start_frame(self):
+        self.current = [0.0] * len(STAGE_NAMES)
+        self.frame_start = time.perf_counter()
+
+    def add(self, stage, seconds): # time spent in a stage of the current frame
+        self.current[stage] += seconds
+
+    def end_frame(self, steps):
+        if self.frame_start is None:
+            return
+        self.starts.append(self.frame_start)
+        for stage, seconds in enumerate(self.current):
+            self.stages[stage].append(seconds)
+        self.steps.append(steps)
+        self.frame_start = None
+
+    @property
+    def frames(self):
+        return len(self.starts)
+
+    def totals(self): # seconds spent in every stage over the whole run
+        return {name: sum(self.stages[stage]) for stage, name in enumerate(STAGE_NAMES)}
+
+    def stats(self, last=None): # summary of the last frames (all of them if None)
+        first = 0 if last is None else max(self.frames - last, 0)
+        count = self.frames - first
+        if count == 0:
+            return {'frames': 0, 'fps': 0.0, 'steps_per_second': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'bottleneck': None}
+        frame_times = [sum(self.stages[stage][i] for stage in range(len(STAGE_NAMES))) for i in range(first, self.frames)]
+        stage_totals = [sum(self.stages[stage][first:]) for stage in range(len(STAGE_NAMES))]
+        wall = self.starts[-1] - self.starts[first] + frame_times[-1] # from the start of the first frame to the end of the last one
+        steps = sum(self.steps[first:])
+        return {
+            'frames': count,
+            'fps': count / wall if wall > 0 else 0.0,
+            'steps_per_second': steps / wall if wall > 0 else 0.0,
+            'p50_ms': percentile(frame_times, 50) * 1000,
+            'p99_ms': percentile(frame_times, 99) * 1000,
+            'bottleneck': STAGE_NAMES[stage_totals.index(max(stage_totals))],
+            **{name + '_ms_per_frame': stage_totals[stage] / count * 1000 for stage, name in enumerate(STAGE_NAMES)},
+        }
+
+    def overlay_text(self, last=60): # the lines shown on top of the canvas
+        s = self.stats(last)
+        if not s['frames']:
+            return "no frames yet"
+        return ("FPS {:.1f}   steps/s {:,.0f}\n"
+                "frame p50 {:.2f} ms   p99 {:.2f} ms\n"
+                "step {:.2f}  apply {:.2f}  draw {:.2f} ms/frame ({} is the slowest)").format(
+            s['fps'], s['steps_per_second'], s['p50_ms'], s['p99_ms'],
+            s['step_ms_per_frame'], s['apply_ms_per_frame'], s['draw_ms_per_frame'], s['bottleneck'])
+
+    def export(self, path): # writes every frame and the summary, CSV if path ends with .csv, JSON otherwise
+        rows = [{'frame': i, 'start': self.starts[i] - self.starts[0], 'steps': self.steps[i],
+                 **{name + '_ms': self.stages[stage][i] * 1000 for stage, name in enumerate(STAGE_NAMES)}}
+                for i in range(self.frames)]
+        with open(path, 'w', newline='') as out:
+            if path.endswith('.csv'):
+                writer = csv.DictWriter(out, fieldnames=['frame', 'start', 'steps'] + [name + '_ms' for name in STAGE_NAMES])
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                json.dump({'summary': self.stats(), 'totals_s': self.totals(), 'frames': rows}, out, indent=2)
@@ -0,0 +1,302 @@
+# Bar chart renderers used by the MainWindow animations.
+#
+# BlitBarRenderer builds the bars once per run and after that only redraws the
+# bars that changed. The axes without any bars on it is cached once (the
+# "background"), and for every changed bar the column it lives in is restored
+# from the background, the bar is drawn again and only that column is blitted to
+# the screen. So the cost of a frame depends on how many bars changed, not on
+# the size of the array.
+#
+# When the array has more elements than the axes has pixel columns, one bar
+# per element would mostly draw over itself. Then the elements are put into one
+# bucket per pixel column and every column gets two bars: a light one up to the
+# biggest value of its bucket and a dark one up to the smallest (the envelope of
+# the bucket). Only the columns of the changed elements are recomputed, so the
+# number of artists and the cost of a frame depend on the screen width, not n.
+#
+# RaceRenderer puts several BlitBarRenderers in a grid of axes on one figure,
+# for racing the algorithms against each other. Every panel redraws its own
+# changed bars and the whole frame is shown with one blit.
+#
+# Run `python renderers.py` to compare the frame times against the old ways of
+# drawing (rebuilding the chart / redrawing the whole canvas).
+from matplotlib.transforms import Bbox # used to tell the canvas which part of the screen to blit
+import math
+import time
+
+from arrays import is_numpy, column_maxima, column_minima, np # NumPy arrays get their columns from vectorized reductions
+
+
+class BlitBarRenderer:
+    def __init__(self, figure, canvas):
+        self.figure = figure # the figure the bars are drawn on
+        self.canvas = canvas # the canvas that shows the figure
+        self.ax = None
+        self.bars = []
+        self.low_bars = [] # the smallest value of every column, empty when there is one bar per element
+        self.step = 1 # elements per bar
+        self.text = None
+        self.background = None # the axes without the bars, copied from the canvas
+        self.left = 0.0 # pixel position of the left edge of bar 0
+        self.bar_width = 1.0 # pixels from the start of one bar to the start of the next
+        self.clip = Bbox.unit() # clip box shared by the bars, moved to the span being redrawn
+        self.canvas.mpl_connect('draw_event', self._on_draw) # a full draw (first show, resize...) invalidates the background
+
+    def reset(self, arr, title="", xlabel="", ylabel="", ax=None, colors=None): # builds the bar chart for a new run
+        # with ax the bars go on that axes and the caller draws the canvas (e.g. once for a grid of panels)
+        # colors gives every index its own colour (e.g. the region of a worker), a column takes the colour of its first index
+        own_figure = ax is None
+        if own_figure:
+            self.figure.clear()
+            ax = self.figure.add_subplot(111)
+        self.ax = ax
+        n = len(arr)
+        count = min(n, max(int(self.ax.get_window_extent().width), 1)) # pixel columns of the axes
+        if count < n:
+            self.step = n / count
+            lows, highs = self._envelopes(arr, count, range(count))
+            x = [c * self.step for c in range(count)]
+            if colors is None:
+                high_color, low_color, alpha = '#8080ff', 'b', None
+            else:
+                low_color = [colors[c * n // count] for c in range(count)]
+                high_color, alpha = low_color, 0.5 # the same colours, lighter
+            self.bars = self.ax.bar(x, highs, align="edge", width=self.step, color=high_color, alpha=alpha, animated=True) # animated bars are left out of canvas.draw(), we draw them ourselves
+            self.low_bars = self.ax.bar(x, lows, align="edge", width=self.step, color=low_color, animated=True)
+        else:
+            self.step = 1
+            self.bars = self.ax.bar(range(n), arr, align="edge", width=0.8, color='b' if colors is None else colors, animated=True)
+            self.low_bars = []
+        self.ax.set_xlim(0, max(n, 1))
+        self.ax.set_ylim(0, int(1.1 * (arr.max() if is_numpy(arr) and n else max(arr, default=0))) + 1)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.ax.set_title(title, fontdict={'fontsize': 12, 'fontweight': 'medium', 'color': '#E4365D'})
+        self.text = self.ax.text(0.01, 0.95, "", transform=self.ax.transAxes, color="#E4365D", animated=True)
+        for artist in (*self.bars, *self.low_bars, self.text): # redrawn bars are clipped to the restored span, so their edges are not blended twice
+            artist.set_clip_box(self.clip)
+            artist.set_clip_on(True)
+        self.background = None
+        if own_figure:
+            self.canvas.draw() # draws the axes once, _on_draw then caches the background and draws the bars
+
+    def detach(self): # stops drawing bars, e.g. when the figure is reused for another chart
+        self.ax = None
+        self.bars = []
+        self.low_bars = []
+        self.text = None
+        self.background = None
+
+    def update(self, arr, dirty, blit=True): # redraws the bars at the indices in dirty with their new heights from arr
+        # returns the region that was redrawn, with blit=False it is left to the caller to blit it
+        if self.background is None or not dirty:
+            return None
+        changed = self._set_heights(arr, dirty)
+        if len(changed) * 4 > len(self.bars): # most of the bars changed, one full draw is cheaper than many spans
+            self.canvas.draw()
+            return None
+        return self._redraw([self._column(k) for k in changed], blit)
+
+    def set_text(self, s, blit=True): # changes the text in the top left corner of the chart, returns the redrawn region
+        if self.text is None:
+            return None
+        if self.background is None:
+            self.text.set_text(s)
+            return None
+        renderer = self.canvas.get_renderer()
+        old = self.text.get_window_extent(renderer)
+        self.text.set_text(s)
+        new = self.text.get_window_extent(renderer)
+        return self._redraw([(math.floor(min(old.x0, new.x0)) - 1, math.ceil(max(old.x1, new.x1)) + 1)], blit)
+
+    # ---------------------- Helper Functions ----------------------
+    def _on_draw(self, event): # called by matplotlib after every full draw of the canvas
+        if self.ax is None:
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        x0 = self.ax.transData.transform((0, 0))[0]
+        x1 = self.ax.transData.transform((self.step, 0))[0]
+        self.left = x0
+        self.bar_width = x1 - x0
+        self.clip.set_points(self.ax.bbox.get_points().copy()) # a copy, the span setters below must not move the axes bbox
+        for bar in (*self.bars, *self.low_bars): # only a full draw pays for every bar
+            self.ax.draw_artist(bar)
+        self.ax.draw_artist(self.text)
+
+    def _set_heights(self, arr, dirty): # gives the bars of the indices in dirty their new heights, returns the bars that changed
+        if not self.low_bars: # one bar per element
+            for i in dirty:
+                self.bars[i].set_height(arr[i])
+            return dirty
+        n = len(arr)
+        count = len(self.bars)
+        if is_numpy(arr):
+            changed = np.unique(((np.fromiter(dirty, dtype=np.int64, count=len(dirty)) + 1) * count - 1) // n).tolist()
+        else:
+            changed = sorted({((i + 1) * count - 1) // n for i in dirty}) # the buckets that hold them, buckets start at c * n // count
+        lows, highs = self._envelopes(arr, count, changed)
+        for c, low, high in zip(changed, lows, highs):
+            self.bars[c].set_height(high)
+            self.low_bars[c].set_height(low)
+        return changed
+
+    def _envelopes(self, arr, count, columns): # smallest and biggest value of every bucket in columns
+        n = len(arr)
+        if is_numpy(arr): # all the buckets at once
+            columns = np.asarray(columns, dtype=np.int64)
+            return column_minima(arr, count, columns).tolist(), column_maxima(arr, count, columns).tolist()
+        lows, highs = [], []
+        for c in columns:
+            bucket = arr[c * n // count:(c + 1) * n // count]
+            lows.append(min(bucket))
+            highs.append(max(bucket))
+        return lows, highs
+
+    def _column(self, i): # the pixel columns covered by bar i
+        return (math.floor(self.left + i * self.bar_width) - 1,
+                math.ceil(self.left + (i + 1) * self.bar_width) + 1)
+
+    def _redraw(self, spans, blit=True): # restores the background under each pixel span and draws the bars in it again
+        bx0, by0, bx1, by1 = self.background.get_extents() # region in agg pixels (y goes down)
+        ay0, ay1 = self.ax.bbox.y0, self.ax.bbox.y1 # same region in display pixels (y goes up)
+        spans.sort()
+        merged = []
+        for x0, x1 in spans: # merge spans that touch so no bar is drawn twice
+            x0, x1 = max(x0, bx0), min(x1, bx1)
+            if x0 >= x1:
+                continue
+            if merged and x0 <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], x1)
+            else:
+                merged.append([x0, x1])
+        if not merged:
+            return None
+
+        n = len(self.bars)
+        text_box = self.text.get_window_extent(self.canvas.get_renderer())
+        for x0, x1 in merged:
+            self.canvas.restore_region(self.background, bbox=(x0, by0, x1 - 1, by1), xy=(bx0, by0)) # agg restores x1 inclusive, the clip box excludes it
+            self.clip.x0, self.clip.x1 = x0, x1
+            first = max(int((x0 - self.left) / self.bar_width) - 1, 0)
+            last = min(int((x1 - self.left) / self.bar_width) + 1, n - 1)
+            for k in range(first, last + 1):
+                self.ax.draw_artist(self.bars[k])
+                if self.low_bars:
+                    self.ax.draw_artist(self.low_bars[k])
+            if text_box.x0 < x1 and text_box.x1 > x0: # the text sits on top of the bars
+                self.ax.draw_artist(self.text)
+        region = Bbox.from_extents(merged[0][0], ay0, merged[-1][1], ay1)
+        if blit:
+            self.canvas.blit(region) # one blit for everything that changed
+        return region
+
+
+class RaceRenderer:
+    def __init__(self, figure, canvas):
+        self.figure = figure
+        self.canvas = canvas
+        self.panels = [] # one BlitBarRenderer per axes, kept for the next race
+        self.active = [] # the panels of the current race
+
+    def reset(self, arrays, titles): # builds a grid of bar charts, one per array
+        self.figure.clear()
+        count = len(arrays)
+        rows = max(int(math.sqrt(count)), 1)
+        cols = math.ceil(count / rows)
+        while len(self.panels) < count:
+            self.panels.append(BlitBarRenderer(self.figure, self.canvas))
+        for panel in self.panels[count:]:
+            panel.detach()
+        self.active = self.panels[:count]
+        for index, (panel, arr, title) in enumerate(zip(self.active, arrays, titles)):
+            panel.reset(arr, title, ax=self.figure.add_subplot(rows, cols, index + 1))
+        self.figure.tight_layout()
+        self.canvas.draw() # one draw for every panel, each one caches its background in _on_draw
+
+    def detach(self):
+        for panel in self.panels:
+            panel.detach()
+        self.active = []
+
+    def update(self, arrays, dirties, texts): # redraws every panel's changed bars and its text, then blits once
+        if any(panel.background is None for panel in self.active):
+            return
+        changed = [panel._set_heights(arr, dirty) if dirty else [] for panel, arr, dirty in zip(self.active, arrays, dirties)]
+        if any(len(bars) * 4 > len(panel.bars) for panel, bars in zip(self.active, changed)):
+            for panel, text in zip(self.active, texts): # one full draw is cheaper
+                panel.text.set_text(text)
+            self.canvas.draw()
+            return
+        regions = []
+        for panel, bars, text in zip(self.active, changed, texts):
+            if bars:
+                regions.append(panel._redraw([panel._column(k) for k in bars], blit=False))
+            regions.append(panel.set_text(text, blit=False))
+        regions = [region for region in regions if region is not None]
+        if regions:
+            self.canvas.blit(Bbox.union(regions)) # the pixels between the panels didn't change, blitting them again is harmless
+
+
+# ---------------------- Frame Time Measurement ----------------------
+def measure_frame_times(n, frames=200):
+    # times the three ways of drawing a frame on an offscreen Agg canvas (no display needed)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from random import randint
+    from algorithms import quick_sort, apply_event, changed_indices, COMPARE
+
+    arr = [randint(0, 50) for _ in range(n)]
+    events = []
+    for event in quick_sort(arr.copy()): # the first changes the algorithm makes
+        if event[0] != COMPARE:
+            events.append(event)
+            if len(events) == frames:
+                break
+
+    results = {}
+    slow_frames = max(1, frames * 500 // max(n, 1)) # the old ways get very slow for big n, so time fewer frames
+
+    figure = Figure(figsize=(8, 4))
+    canvas = FigureCanvasAgg(figure)
+    frame = arr.copy()
+    start = time.perf_counter()
+    for event in events[:slow_frames]: # old viz_final.py: rebuild the whole chart every frame
+        apply_event(frame, event)
+        figure.clear()
+        ax = figure.add_subplot(111)
+        ax.bar(range(len(frame)), frame, color='b')
+        canvas.draw()
+    results['rebuild'] = (time.perf_counter() - start) / len(events[:slow_frames])
+
+    figure = Figure(figsize=(8, 4))
+    canvas = FigureCanvasAgg(figure)
+    frame = arr.copy()
+    ax = figure.add_subplot(111)
+    bars = ax.bar(range(len(frame)), frame, color='b')
+    canvas.draw()
+    start = time.perf_counter()
+    for event in events[:slow_frames]: # old testing.py: reuse the bars, redraw the whole canvas
+        apply_event(frame, event)
+        for rect, val in zip(bars, frame):
+            rect.set_height(val)
+        canvas.draw()
+    results['full draw'] = (time.perf_counter() - start) / len(events[:slow_frames])
+
+    figure = Figure(figsize=(8, 4))
+    canvas = FigureCanvasAgg(figure)
+    frame = arr.copy()
+    renderer = BlitBarRenderer(figure, canvas)
+    renderer.reset(frame)
+    start = time.perf_counter()
+    for event in events: # BlitBarRenderer: only the changed bars
+        apply_event(frame, event)
+        renderer.update(frame, changed_indices(event))
+    results['blit'] = (time.perf_counter() - start) / len(events)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'n':>8} {'rebuild (ms)':>14} {'full draw (ms)':>15} {'blit (ms)':>10}")
+    for n in (500, 5000, 50000):
+        r = measure_frame_times(n)
+        print(f"{n:>8} {r['rebuild'] * 1000:>14.2f} {r['full draw'] * 1000:>15.2f} {r['blit'] * 1000:>10.3f}")
@@ -0,0 +1,108 @@
+# One timer for every animation of the app.
+#
+# MainWindow used to connect a new execution_time to its QTimer on every click
+# of "Sort Array" without disconnecting the old one, so each tick stepped and
+# drew every run started so far. Now the Scheduler owns the only QTimer and an
+# animation is a Session: a step function that is called once per frame while
+# the session runs. A session can be started, paused, cancelled, or replaced by
+# a new one (the old one is cancelled first). Redraws asked for with
+# request_draw() are merged, so each one is done at most once per tick, after
+# every session has stepped. The timer only runs while there is something to do
+# and ticks at the fastest frame rate the running sessions want. So the cost of
+# a tick depends on the running sessions, not on how the UI was clicked before.
+#
+#   self.session = shared_scheduler().start(step, interval_ms=33, replacing=self.session)
+#   self.session.pause() ... self.session.start() ... self.session.cancel()
+from PyQt5.QtCore import QObject, QTimer
+import time
+
+
+class Session:
+    def __init__(self, scheduler, step, interval_ms):
+        self.scheduler = scheduler
+        self.step = step # called once per frame while the session runs
+        self.interval_ms = interval_ms # time between two frames of this session
+        self.running = False
+        self.cancelled = False
+        self.due = 0.0 # perf_counter() time of the next frame
+
+    def start(self): # (re)starts stepping, does nothing once cancelled
+        if self.cancelled:
+            return
+        self.running = True
+        self.due = time.perf_counter()
+        self.scheduler._update_timer()
+
+    def pause(self):
+        self.running = False
+        self.scheduler._update_timer()
+
+    def cancel(self): # stops for good, the scheduler forgets the session
+        self.running = False
+        self.cancelled = True
+        self.scheduler._remove(self)
+
+    def set_interval(self, interval_ms):
+        self.interval_ms = interval_ms
+        self.scheduler._update_timer()
+
+
+class Scheduler(QObject):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sessions = []
+        self.draws = {} # draws asked for since the last tick, a dict keeps them in order without repeats
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self, step, interval_ms, replacing=None): # steps step once per frame from now on, returns its Session
+        if replacing is not None:
+            replacing.cancel()
+        session = Session(self, step, interval_ms)
+        self.sessions.append(session)
+        session.start()
+        return session
+
+    def request_draw(self, draw): # draw() is called once at the end of the next tick, however often it is asked for
+        self.draws[draw] = None
+        self._update_timer()
+
+    # ---------------------- Helper Functions ----------------------
+    def _tick(self):
+        now = time.perf_counter()
+        slack = self.timer.interval() / 2000 # half a tick, so a timer that fires a bit early doesn't skip a frame
+        for session in list(self.sessions): # a step can pause or cancel sessions, its own or others
+            if session.running and now + slack >= session.due:
+                session.due = now + session.interval_ms / 1000
+                session.step()
+        draws, self.draws = self.draws, {}
+        for draw in draws:
+            draw()
+        self._update_timer()
+
+    def _remove(self, session):
+        if session in self.sessions:
+            self.sessions.remove(session)
+        self._update_timer()
+
+    def _update_timer(self): # runs the timer at the fastest running session's rate, or stops it
+        intervals = [session.interval_ms for session in self.sessions if session.running]
+        if intervals:
+            interval = min(intervals)
+        elif self.draws:
+            interval = 0 # only draws left, do them when Qt is next idle
+        else:
+            self.timer.stop()
+            return
+        if not self.timer.isActive() or self.timer.interval() != interval:
+            self.timer.start(interval)
+
+
+_shared = None
+
+
+def shared_scheduler(): # the scheduler of every window, made the first time it is needed (after the QApplication)
+    global _shared
+    if _shared is None:
+        _shared = Scheduler()
+    return _shared
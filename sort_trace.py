@@ -0,0 +1,189 @@
+# Recording a sorting run to a file and replaying it later.
+#
+# A trace file holds the array the run started with and the events the
+# algorithm yielded, so a run can be watched again (or shared) without running
+# the algorithm. Only the first array is stored in full, after that every step
+# is one fixed-width record, so the file grows with the number of steps and not
+# with n * steps like a list of array copies would.
+#
+# File layout (little endian):
+#   header    magic b'SRTR', version (u16), value type code (u8, 'i' or 'q'), flags (u8), n (u64)
+#   array     n values of the value type
+#   chunks    repeated: compressed (u8), records (u32), payload bytes (u32), payload
+#   record    op (u8), a (i32), b (value type)
+# A chunk's payload is the records packed back to back, zlib compressed if the
+# chunk says so. The reader mmaps the file and reads the chunks one at a time.
+#
+#   python sort_trace.py record --algorithm "Merge Sort" --size 100000 run.trace
+#   python sort_trace.py info run.trace
+from array import array
+import argparse
+import mmap
+import struct
+import sys
+import zlib
+
+from algorithms import ALGORITHMS, COMPARE
+
+MAGIC = b'SRTR'
+VERSION = 1
+HEADER = struct.Struct('<4sHBBQ')
+CHUNK_HEADER = struct.Struct('<BII')
+CHUNK_RECORDS = 65536 # records per chunk
+
+
+def record_struct(typecode): # the fixed-width record for a value type
+    return struct.Struct('<Bi' + typecode)
+
+
+def value_typecode(arr): # 'i' (32 bit) if every value fits, otherwise 'q' (64 bit)
+    if all(-2 ** 31 <= v < 2 ** 31 for v in arr):
+        return 'i'
+    return 'q'
+
+
+class TraceWriter:
+    def __init__(self, path, initial, compress=True, typecode=None):
+        self.file = open(path, 'wb')
+        self.compress = compress # zlib compress every chunk
+        self.typecode = typecode or value_typecode(initial)
+        self.record = record_struct(self.typecode)
+        self.buffer = bytearray() # records of the chunk being filled
+        self.count = 0 # records in the buffer
+        self.steps = 0 # records written in total
+
+        self.file.write(HEADER.pack(MAGIC, VERSION, ord(self.typecode), 1 if compress else 0, len(initial)))
+        values = array(self.typecode, initial)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        self.file.write(values.tobytes())
+
+    def write(self, event): # adds one event to the trace
+        self.buffer += self.record.pack(*event)
+        self.count += 1
+        if self.count == CHUNK_RECORDS:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _flush(self): # writes the buffered records as one chunk
+        if not self.count:
+            return
+        payload = bytes(self.buffer)
+        compressed = 0
+        if self.compress:
+            packed = zlib.compress(payload, 6)
+            if len(packed) < len(payload): # incompressible chunks are stored as they are
+                payload, compressed = packed, 1
+        self.file.write(CHUNK_HEADER.pack(compressed, self.count, len(payload)))
+        self.file.write(payload)
+        self.steps += self.count
+        self.buffer = bytearray()
+        self.count = 0
+
+
+class TraceReader:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) # the OS pages the file in as it is read
+        magic, version, typecode, flags, n = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not a sorting trace".format(path))
+        if version != VERSION:
+            raise ValueError("unsupported trace version {}".format(version))
+        self.typecode = chr(typecode)
+        self.record = record_struct(self.typecode)
+        self.n = n
+        self.array_offset = HEADER.size
+        self.chunks_offset = self.array_offset + n * array(self.typecode).itemsize
+        self.chunks = self._index_chunks() # (file offset, compressed, records) of every chunk
+        self.steps = sum(records for _, _, records in self.chunks)
+
+    def initial(self): # the array the run started with, as a list
+        values = array(self.typecode)
+        values.frombytes(self.map[self.array_offset:self.chunks_offset])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values.tolist()
+
+    def events(self, first_chunk=0): # yields every recorded event, starting at a chunk
+        for index in range(first_chunk, len(self.chunks)):
+            yield from self.chunk_events(index)
+
+    def chunk_events(self, index): # the events of one chunk
+        offset, compressed, _ = self.chunks[index]
+        _, _, size = CHUNK_HEADER.unpack_from(self.map, offset)
+        start = offset + CHUNK_HEADER.size
+        payload = self.map[start:start + size] # a copy of one chunk, a view of the map would stop close() while an iterator still holds it
+        if compressed:
+            payload = zlib.decompress(payload)
+        return self.record.iter_unpack(payload)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _index_chunks(self): # walks the chunk headers once so any chunk can be found quickly
+        chunks = []
+        offset = self.chunks_offset
+        while offset < len(self.map):
+            compressed, records, size = CHUNK_HEADER.unpack_from(self.map, offset)
+            chunks.append((offset, compressed, records))
+            offset += CHUNK_HEADER.size + size
+        return chunks
+
+
+def record_trace(path, steps_func, arr, compress=True, include_compares=False, **kwargs):
+    # runs the step version of an algorithm on arr (without changing it) and writes the run to path, returns the number of events written
+    with TraceWriter(path, arr, compress=compress) as writer:
+        for event in steps_func(list(arr), **kwargs):
+            if include_compares or event[0] != COMPARE:
+                writer.write(event)
+    return writer.steps
+
+
+# ---------------------- Command Line ----------------------
+def main(argv=None):
+    from bench import make_array, DISTRIBUTIONS
+
+    parser = argparse.ArgumentParser(description="Record sorting runs to trace files and look at them.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="run an algorithm and record it")
+    record.add_argument('path')
+    record.add_argument('--algorithm', default='Quick Sort', choices=list(ALGORITHMS))
+    record.add_argument('--size', type=int, default=1000)
+    record.add_argument('--distribution', default='uniform', choices=DISTRIBUTIONS)
+    record.add_argument('--seed', type=int, default=0)
+    record.add_argument('--no-compress', action='store_true', help="store the chunks without zlib")
+    record.add_argument('--compares', action='store_true', help="also record the comparisons")
+    info = commands.add_parser('info', help="print what a trace file holds")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        arr = make_array(args.size, args.distribution, args.seed)
+        events = record_trace(args.path, ALGORITHMS[args.algorithm].steps, arr,
+                              compress=not args.no_compress, include_compares=args.compares)
+        print("recorded {} events of {} on {} elements to {}".format(events, args.algorithm, args.size, args.path))
+    else:
+        with TraceReader(args.path) as reader:
+            print("elements: {}  events: {}  chunks: {}  value type: {}".format(
+                reader.n, reader.steps, len(reader.chunks), reader.typecode))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Checks how long it takes to import the library and to open the GUI.
+#
+# Every check runs in a fresh interpreter with `python -X importtime`, adds up
+# the cumulative time of the top level imports (leaving out the ones the
+# interpreter does on its own at startup) and compares it with a budget.
+# The slowest modules are listed, so when a budget is blown it's easy to see
+# which import did it. Exits with 1 if any check is over its budget.
+#
+#   python startup_check.py
+import os
+import subprocess
+import sys
+
+CHECKS = [ # (name, code that is run, budget in ms)
+    ('algorithms', "import algorithms", 20),
+    ('bench', "import bench", 60),
+    ('testing (import only)', "import testing", 250),
+    ('testing (window created)', "from PyQt5.QtWidgets import QApplication; app = QApplication([]); import testing; testing.MainWindow()", 1500),
+]
+
+
+def import_times(code): # runs code in a new interpreter, returns [(module, self us, cumulative us, depth), ...]
+    env = dict(os.environ)
+    if not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen') # the window can still be created without a display
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2 # nested imports are indented by two more spaces per level
+        times.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return times
+
+
+def main():
+    failed = False
+    startup = {module for module, _, _, _ in import_times("pass")} # imported by the interpreter before any of our code runs
+    for name, code, budget in CHECKS:
+        times = [t for t in import_times(code) if t[0] not in startup]
+        total_ms = sum(cumulative for _, _, cumulative, depth in times if depth == 0) / 1000
+        status = 'ok' if total_ms <= budget else 'OVER BUDGET'
+        failed = failed or total_ms > budget
+        print(f"{name:<26} {total_ms:8.1f} ms  (budget {budget} ms)  {status}")
+        for module, self_us, _, _ in sorted(times, key=lambda t: -t[1])[:5]: # the slowest modules by their own time
+            print(f"    {self_us / 1000:8.1f} ms  {module}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
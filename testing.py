@@ -1,76 +1,77 @@
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QLabel, QComboBox, QMainWindow # importing PyQt5 modules. So we can use the GUI functionality of PyQt5.
-from PyQt5.QtCore import QTimer, QTime # This allows us to display the time in the GUI.
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel, QComboBox, QMainWindow, QSpinBox, QDoubleSpinBox, QCheckBox, QFileDialog, QSlider, QPlainTextEdit # importing PyQt5 modules. So we can use the GUI functionality of PyQt5.
+from PyQt5.QtCore import QTime, Qt # This allows us to display the time in the GUI.
 from PyQt5.QtGui import QPalette, QColor # This allows us to change the background color of the GUI.
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas  # This allows us to display the figure in the GUI by using the canvas.
-from matplotlib.figure import Figure # FigureCanvasQTAgg is the canvas to display the figure.
 from random import randint # For generating a random array
 import sys # mporting the sys module.
 import time
 
+from algorithms import ALGORITHMS, SWAP, WRITE # the sorting algorithms, a step version for the animation and a fast one for timing
+from bench import benchmark, geometric_sizes, fit_power_law, fit_nlogn, DISTRIBUTIONS # times the fast version of an algorithm
+from painter_canvas import PainterBarCanvas # draws the bars with QPainter, for very big arrays
+from pacing import FramePacer, advance # does as many steps as fit in a frame, then draws once
+from worker import SortWorker, SweepWorker, BenchmarkWorker, drain # steps the algorithm on its own thread
+from sort_trace import TraceReader, record_trace # saves a run to a file and plays it back
+from timeline import Timeline # keeps the run's history so we can jump back and forth
+from counters import OperationCounter # counts comparisons, swaps, writes, extra memory and recursion depth
+from profiling import FrameProfiler, APPLY, DRAW # times the stepping, applying and drawing of every frame
+from arrays import HAVE_NUMPY, random_array # the array can be a NumPy int32 buffer instead of a list
+from scheduler import shared_scheduler # one timer for every animation, a run is a session on it
+from observers import OBSERVERS, observe # cProfile, tracemalloc and step timing of a run, off unless ticked
+
+REGION_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'] # one per worker of a parallel sort
+
+
+class ObserverPanel(QWidget): # tick boxes for the observers of the next run, and what they saw in the last one
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        row = QHBoxLayout()
+        row.addWidget(QLabel("Observe:"))
+        self.checkboxes = {}
+        for name in OBSERVERS:
+            self.checkboxes[name] = QCheckBox(name)
+            row.addWidget(self.checkboxes[name])
+        self.export_button = QPushButton("Export pstats...") # saves the cProfile stats of the last run
+        self.export_button.setEnabled(False)
+        self.export_button.clicked.connect(self.export_pstats)
+        row.addWidget(self.export_button)
+        row.addStretch()
+        layout.addLayout(row)
+        self.reports = QPlainTextEdit() # shown once a watched run is over
+        self.reports.setReadOnly(True)
+        self.reports.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.reports.setStyleSheet("font-family: monospace;")
+        self.reports.setMaximumHeight(160)
+        self.reports.hide()
+        layout.addWidget(self.reports)
+        self.setLayout(layout)
+        self.observers = {} # name -> observer, of the last run
+
+    def make(self): # new observers for a run, one per ticked box (none ticked gives [] and the run isn't slowed down)
+        self.observers = {name: OBSERVERS[name]() for name, box in self.checkboxes.items() if box.isChecked()}
+        self.export_button.setEnabled(False)
+        self.reports.hide()
+        return list(self.observers.values())
+
+    def show_reports(self): # shows what the observers of the last run saw
+        reports = [(name, observer.report()) for name, observer in self.observers.items()]
+        reports = ["{}\n{}".format(name, report) for name, report in reports if report]
+        self.reports.setPlainText("\n\n".join(reports))
+        self.reports.setVisible(bool(reports))
+        self.export_button.setEnabled('cProfile' in self.observers)
+
+    def export_pstats(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export pstats", "", "Profile stats (*.pstats *.prof)")
+        if path:
+            self.observers['cProfile'].export(path)
 
-# ---------------------- Algorithms ----------------------
-def insertion_sort(arr, key=lambda x: x):
-    for i in range(1, len(arr)): # for i in range from 1 to the length of the array
-        key_value = arr[i] # set key_value to the value at index i
-        j = i - 1 
-        while j >= 0 and key(arr[j]) > key_value: # while j is greater than 0 and the key of the element at index j is greater than the key of the element at index i
-            arr[j + 1] = arr[j] # set the element at index j + 1 to the element at index j
-            j -= 1 # decrement j
-            yield arr.copy() # return the current state of the array
-
-        arr[j + 1] = key_value # set the element at index j + 1 to the key_value
-        yield arr.copy() # return the current state of the array
-
-def merge_sort(arr, key=lambda x: x):
-    if len(arr) > 1: # if the length of the array is greater than 1 then 
-        mid = len(arr) // 2 # divide the array into 2
-        L, R = arr[:mid], arr[mid:] # set L to the first half of the array and R to the second half
-        yield from merge_sort(L, key)  # call the merge_sort function on the first half
-        yield from merge_sort(R, key)  # call the merge_sort function on the second half
-
-        i = j = k = 0 
-        while i < len(L) and j < len(R): # while i is less than the length of L and j is less than the length of R 
-            if key(L[i]) < key(R[j]): # if the key of the element in L is less than the key of the element in R
-                arr[k] = L[i] # set arr[k] to the element in L
-                i += 1 # increment i
-            else:
-                arr[k] = R[j] # set arr[k] to the element in R
-                j += 1  # increment j
-            k += 1 # increment k
-            yield arr.copy() # return the current state of the array
-
-        while i < len(L): # while i is less than the length of L
-            arr[k] = L[i] # set arr[k] to the element in L
-            i += 1 # increment i
-            k += 1 # increment k
-            yield arr.copy() # return the current state of the array
-
-        while j < len(R): # while j is less than the length of R
-            arr[k] = R[j] # set arr[k] to the element in R
-            j += 1 # increment j
-            k += 1 # increment k
-            yield arr.copy() # return the current state of the array
-
-def quick_sort(arr, key=lambda x: x): #
-    if len(arr) <= 1: # if the length of the array is less than or equal to 1, return the array
-        return arr
-
-    pivot = arr[0] # set the pivot to the first element of the array
-    less = [x for x in arr[1:] if key(x) <= key(pivot)] # set less to all elements in the array that are less than or equal to the pivot
-    greater = [x for x in arr[1:] if key(x) > key(pivot)] # set greater to all elements in the array that are greater than the pivot
-
-    # yield from quick_sort(less) + [pivot] + quick_sort(greater)
-    yield from quick_sort(less, key)  
-    yield [pivot] 
-    yield from quick_sort(greater, key) 
-
-    arr.clear() # this is the same as arr = []
-    arr.extend(less + [pivot] + greater) # this is the same as arr = less + [pivot] + greater
-    yield arr.copy() # return the current state of the array
 
 class RunningTimesWindow(QWidget):
     def __init__(self):
         super().__init__()
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas # matplotlib is only loaded when a window is created,
+        from matplotlib.figure import Figure # so importing this module (or the algorithms) stays fast.
         self.setWindowTitle("Algorithm Running Times")
         self.setGeometry(100, 100, 640, 480) 
 
@@ -82,47 +83,174 @@ class RunningTimesWindow(QWidget):
         self.text_box = QLineEdit()
         self.layout.addWidget(self.text_box)
 
+        trials_layout = QHBoxLayout() # every algorithm is timed on trials arrays of this kind, the chart shows their spread
+        trials_layout.addWidget(QLabel("Trials:"))
+        self.trials_box = QSpinBox()
+        self.trials_box.setRange(2, 1000)
+        self.trials_box.setValue(10)
+        trials_layout.addWidget(self.trials_box)
+        trials_layout.addWidget(QLabel("Input:"))
+        self.distribution_combo = QComboBox()
+        self.distribution_combo.addItems(DISTRIBUTIONS)
+        trials_layout.addWidget(self.distribution_combo)
+        self.layout.addLayout(trials_layout)
+
         self.button = QPushButton("Update Running Times")
         self.button.clicked.connect(self.display_running_times)
         self.layout.addWidget(self.button)
 
+        self.observer_panel = ObserverPanel() # watches the timed runs of "Update Running Times"
+        self.layout.addWidget(self.observer_panel)
+
+        sweep_layout = QHBoxLayout() # the sizes for the sweep are 2^smallest ... 2^largest
+        sweep_layout.addWidget(QLabel("Sweep sizes 2^"))
+        self.smallest_box = QSpinBox()
+        self.smallest_box.setRange(1, 30)
+        self.smallest_box.setValue(6)
+        sweep_layout.addWidget(self.smallest_box)
+        sweep_layout.addWidget(QLabel("to 2^"))
+        self.largest_box = QSpinBox()
+        self.largest_box.setRange(1, 30)
+        self.largest_box.setValue(20)
+        sweep_layout.addWidget(self.largest_box)
+        sweep_layout.addWidget(QLabel("cutoff (s):"))
+        self.cutoff_box = QDoubleSpinBox() # an algorithm slower than this is left out of the bigger sizes
+        self.cutoff_box.setRange(0.01, 600)
+        self.cutoff_box.setValue(1.0)
+        sweep_layout.addWidget(self.cutoff_box)
+        self.layout.addLayout(sweep_layout)
+
+        self.sweep_button = QPushButton("Run Scaling Sweep")
+        self.sweep_button.clicked.connect(self.run_sweep)
+        self.layout.addWidget(self.sweep_button)
+
         self.figure = Figure()
         self.canvas = FigureCanvas(self.figure)
         self.layout.addWidget(self.canvas)
 
         self.setLayout(self.layout)
 
-    def display_running_times(self):
+        self.repeat = 5 # runs that are timed in the sweep, the median is shown
+        self.warmup = 1 # runs that are done first and not timed
+        self.seed = 0 # the trial arrays are the same every time, so two clicks can be compared
+
+        self.sweep_worker = None # the thread that runs the sweep
+        self.benchmark_worker = None # the thread that times the trials of "Update Running Times"
+        self.times_results = [] # results of bench.benchmark() shown in the bar chart
+        self.sweep_points = {} # algorithm name -> [(n, seconds), ...]
+        self.sweep_lines = {} # algorithm name -> line on the log-log plot
+
+    def display_running_times(self): # times every algorithm on the trial arrays on a worker thread, the bars show up as they are done
+        self.stop_sweep()
+        self.stop_benchmark()
         array_size = int(self.text_box.text()) if self.text_box.text().isdigit() else 500  
 
         self.figure.clear()
 
-        ax = self.figure.add_subplot(111)
-        ax.set_title('Running Times of Sorting Algorithms')
-        ax.set_ylabel('Time (seconds)')
+        trials = self.trials_box.value()
+        distribution = self.distribution_combo.currentText()
+        self.times_ax = self.figure.add_subplot(111)
+        self.times_title = 'Running Times ({} trials, {} input, n = {})'.format(trials, distribution, array_size)
+        self.times_results = []
+        self.draw_running_times()
+
+        # times the plain version, not the animated one, on the same trial arrays for every algorithm
+        self.benchmark_worker = BenchmarkWorker(list(ALGORITHMS), [array_size], [distribution], trials=trials, seed=self.seed,
+                                                warmup=self.warmup, observers=self.observer_panel.make())
+        self.benchmark_worker.result_ready.connect(self.add_running_time) # called on the GUI thread for every algorithm
+        self.benchmark_worker.finished.connect(self.running_times_done)
+        self.benchmark_worker.start()
+
+    def add_running_time(self, result):
+        if self.sender() is not self.benchmark_worker: # left over from a run that was stopped
+            return
+        if result['mean'] is not None: # leaves out the algorithms that went too deep for this size
+            self.times_results.append(result)
+            self.draw_running_times()
+
+    def running_times_done(self):
+        if self.sender() is self.benchmark_worker and not self.benchmark_worker.stopped:
+            self.observer_panel.show_reports()
+
+    def draw_running_times(self): # the mean of every algorithm timed so far, with its confidence interval
+        ax = self.times_ax
+        ax.clear()
+        ax.set_title(self.times_title)
+        ax.set_ylabel('Mean time (s), 95% CI')
         ax.set_xlabel('Algorithm')
+        results = self.times_results
+        names = list(ALGORITHMS)
+        errors = [[r['mean'] - r['ci_low'] for r in results], [r['ci_high'] - r['mean'] for r in results]]
+        ax.bar([r['algorithm'] for r in results], [r['mean'] for r in results], yerr=errors, capsize=4,
+               color=['C{}'.format(names.index(r['algorithm']) % 10) for r in results]) # every algorithm keeps its own colour
+        ax.tick_params(axis='x', labelrotation=45)
+        self.figure.tight_layout()
+        shared_scheduler().request_draw(self.canvas.draw)
+
+    def run_sweep(self): # times every algorithm over a range of sizes on a worker thread
+        self.stop_sweep()
+        self.stop_benchmark() # the sweep takes over the figure
+        self.sweep_points = {name: [] for name in ALGORITHMS}
+        self.sweep_lines = {}
 
-        random_array = [randint(0, 100) for _ in range(array_size)]
-
-        execution_times = {}
+        self.figure.clear()
+        self.sweep_ax = self.figure.add_subplot(111)
+        self.sweep_ax.set_xscale('log')
+        self.sweep_ax.set_yscale('log')
+        self.sweep_ax.set_title('Scaling of Sorting Algorithms')
+        self.sweep_ax.set_xlabel('Array size n')
+        self.sweep_ax.set_ylabel('Median time (seconds)')
+        self.canvas.draw()
 
-        for algo_name, algo_func in [('Insertion Sort', insertion_sort),
-                                     ('Merge Sort', merge_sort),
-                                     ('Quick Sort', quick_sort)]:
-            start_time = time.perf_counter()
-            list(algo_func(random_array.copy(), key=lambda x: x))  
-            end_time = time.perf_counter()
-            execution_times[algo_name] = end_time - start_time
+        sizes = geometric_sizes(self.smallest_box.value(), self.largest_box.value())
+        algorithms = {name: algorithm.fast for name, algorithm in ALGORITHMS.items()}
+        self.sweep_worker = SweepWorker(algorithms, sizes, lambda n: [randint(0, 100) for _ in range(n)], cutoff=self.cutoff_box.value(),
+                                        repeat=self.repeat, warmup=self.warmup)
+        self.sweep_worker.point_ready.connect(self.add_sweep_point) # called on the GUI thread for every point
+        self.sweep_worker.start()
+
+    def add_sweep_point(self, name, n, seconds): # puts a new point on the plot and fits the curve again
+        points = self.sweep_points[name]
+        points.append((n, seconds))
+        if name not in self.sweep_lines:
+            self.sweep_lines[name], = self.sweep_ax.plot([], [], marker='o')
+        line = self.sweep_lines[name]
+        line.set_data([p[0] for p in points], [p[1] for p in points])
+
+        k, c = fit_power_law(points)
+        label = name
+        if k is not None:
+            label += " (t ~ n^{:.2f}, {:.2e}·n·log n)".format(k, fit_nlogn(points)) # the exponent and the n log n constant
+        line.set_label(label)
+
+        self.sweep_ax.relim()
+        self.sweep_ax.autoscale_view()
+        self.sweep_ax.legend(loc='upper left', fontsize='small')
+        shared_scheduler().request_draw(self.canvas.draw) # draws once per tick, even if several points arrive together
+
+    def stop_sweep(self):
+        if self.sweep_worker is not None:
+            self.sweep_worker.stop()
+            self.sweep_worker = None
+
+    def stop_benchmark(self):
+        if self.benchmark_worker is not None:
+            self.benchmark_worker.stop()
+            self.benchmark_worker = None
+
+    def closeEvent(self, event): # the timing threads have to stop before the window goes away
+        self.stop_sweep()
+        self.stop_benchmark()
+        super().closeEvent(event)
 
-        algorithms = list(execution_times.keys())
-        times = list(execution_times.values())
-        ax.bar(algorithms, times, color=['blue', 'green', 'red'])
 
-        self.canvas.draw()
 # ---------------------- GUI ----------------------
 class MainWindow(QWidget):
     def __init__(self): # creating a class that inherits from QWidget.
         super().__init__() # calling the constructor of the parent class
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas # matplotlib is only loaded when a window is created,
+        from matplotlib.figure import Figure # so importing this module (or the algorithms) stays fast.
+        from renderers import BlitBarRenderer # draws the bars once and then only redraws the ones that changed
 
         self.layout = QVBoxLayout() # creates 'Window' for where GUI will be displayed.
 
@@ -133,9 +261,38 @@ class MainWindow(QWidget):
         self.layout.addWidget(self.text_box) # adds the text box to the layout 'Window'.
 
         self.algorithm_combo = QComboBox() # creates a combo box for user to choose sorting algorithm.
-        self.algorithm_combo.addItems(['Insertion Sort', 'Merge Sort', 'Quick Sort']) # adds the sorting algorithms to the combo box.
+        self.algorithm_combo.addItems(list(ALGORITHMS)) # adds the sorting algorithms to the combo box.
         self.layout.addWidget(self.algorithm_combo) # adds the combo box to the layout 'Window'.
 
+        self.renderer_combo = QComboBox() # creates a combo box for user to choose what draws the bars.
+        self.renderer_combo.addItems(['Matplotlib', 'QPainter']) # QPainter keeps up with much bigger arrays.
+        self.renderer_combo.currentTextChanged.connect(self.change_renderer) # swaps the canvas when the choice changes.
+        self.layout.addWidget(self.renderer_combo) # adds the combo box to the layout 'Window'.
+
+        self.pacer = FramePacer(target_fps=30, steps_per_second=20) # 20 steps per second is how fast the old 50 ms timer went
+        pacing_layout = QHBoxLayout() # puts the pacing controls next to each other
+        pacing_layout.addWidget(QLabel("Target FPS:"))
+        self.fps_box = QSpinBox() # creates a box for the number of frames drawn per second.
+        self.fps_box.setRange(1, 120)
+        self.fps_box.setValue(self.pacer.target_fps)
+        self.fps_box.valueChanged.connect(self.change_fps) # connects the box to a function.
+        pacing_layout.addWidget(self.fps_box)
+        pacing_layout.addWidget(QLabel("Steps per second:"))
+        self.steps_box = QSpinBox() # creates a box for how many steps of the algorithm are done per second.
+        self.steps_box.setRange(0, 100000000)
+        self.steps_box.setSpecialValueText("As fast as possible") # shown for 0
+        self.steps_box.setValue(self.pacer.steps_per_second)
+        self.steps_box.valueChanged.connect(self.change_steps_per_second) # connects the box to a function.
+        pacing_layout.addWidget(self.steps_box)
+        self.layout.addLayout(pacing_layout) # adds the pacing controls to the layout 'Window'.
+
+        self.thread_checkbox = QCheckBox("Run the algorithm on a worker thread") # keeps the buttons responsive when steps or draws are slow.
+        self.layout.addWidget(self.thread_checkbox) # adds the check box to the layout 'Window'.
+
+        self.numpy_checkbox = QCheckBox("Store the array in a NumPy int32 buffer") # less memory and vectorized setup and column heights for big arrays.
+        self.numpy_checkbox.setEnabled(HAVE_NUMPY) # only if NumPy is installed
+        self.layout.addWidget(self.numpy_checkbox) # adds the check box to the layout 'Window'.
+
         self.button = QPushButton("Sort Array") # creates a button for user to click to sort array.
         self.button.clicked.connect(self.animate_sort) # connects the button to a function.
         self.layout.addWidget(self.button) # adds the button to the layout 'Window'.
@@ -148,88 +305,327 @@ class MainWindow(QWidget):
         self.resume_button.clicked.connect(self.resume_animation) # connects the button to a function.
         self.layout.addWidget(self.resume_button) # adds the button to the layout 'Window'.
 
+        timeline_layout = QHBoxLayout() # puts the timeline controls next to each other
+        self.step_back_button = QPushButton("Step Back") # undoes the last step that is shown.
+        self.step_back_button.clicked.connect(self.step_back) # connects the button to a function.
+        timeline_layout.addWidget(self.step_back_button)
+        self.timeline_slider = QSlider(Qt.Horizontal) # drag it to jump to any step of the run so far.
+        self.timeline_slider.valueChanged.connect(self.seek) # connects the slider to a function.
+        timeline_layout.addWidget(self.timeline_slider)
+        self.step_forward_button = QPushButton("Step Forward") # does one more step.
+        self.step_forward_button.clicked.connect(self.step_forward) # connects the button to a function.
+        timeline_layout.addWidget(self.step_forward_button)
+        self.layout.addLayout(timeline_layout) # adds the timeline controls to the layout 'Window'.
+
         self.running_times_button = QPushButton("Show Running Times") # creates a button for user to view the running times of the algorithms.
         self.running_times_button.clicked.connect(self.show_running_times) # connects the button to a function.
         self.layout.addWidget(self.running_times_button) # adds the button to the layout 'Window'.
 
+        trace_layout = QHBoxLayout() # puts the trace buttons next to each other
+        self.record_button = QPushButton("Record Trace...") # runs the algorithm on a new array and saves the run to a file.
+        self.record_button.clicked.connect(self.record_run) # connects the button to a function.
+        trace_layout.addWidget(self.record_button)
+        self.replay_button = QPushButton("Replay Trace...") # plays a saved run without running the algorithm.
+        self.replay_button.clicked.connect(self.replay_run) # connects the button to a function.
+        trace_layout.addWidget(self.replay_button)
+        self.layout.addLayout(trace_layout) # adds the trace buttons to the layout 'Window'.
+
+        profile_layout = QHBoxLayout() # puts the profiling controls next to each other
+        self.overlay_checkbox = QCheckBox("Show profiling overlay") # FPS, steps/s, frame times and where the time goes.
+        self.overlay_checkbox.toggled.connect(self.toggle_overlay) # connects the check box to a function.
+        profile_layout.addWidget(self.overlay_checkbox)
+        self.export_profile_button = QPushButton("Export Profile...") # saves the time of every frame of the last run.
+        self.export_profile_button.clicked.connect(self.export_profile) # connects the button to a function.
+        profile_layout.addWidget(self.export_profile_button)
+        self.layout.addLayout(profile_layout) # adds the profiling controls to the layout 'Window'.
+        self.observer_panel = ObserverPanel() # cProfile, tracemalloc and step times of the next run, what they saw shows up here
+        self.layout.addWidget(self.observer_panel) # adds the observers to the layout 'Window'.
+
         self.execution_time_label = QLabel("Total Execution Time: ") # creates a label to display the total execution time.
         self.layout.addWidget(self.execution_time_label) # adds the label to the layout 'Window'.
 
+        self.counters_label = QLabel("") # creates a label to display the work the algorithm has done so far.
+        self.layout.addWidget(self.counters_label) # adds the label to the layout 'Window'.
+
         self.figure = Figure() # creates a figure.
         self.canvas = FigureCanvas(self.figure) # creates a canvas to display the figure.
         self.layout.addWidget(self.canvas) # adds the canvas to the layout 'Window'.
+        self.renderer = BlitBarRenderer(self.figure, self.canvas) # draws the bars of the array on the canvas.
+        self.matplotlib_canvas, self.matplotlib_renderer = self.canvas, self.renderer # kept so we can switch back to them
+        self.painter_canvas = None # created the first time QPainter is picked
 
         self.setLayout(self.layout) # sets the layout 'Window'
 
+        self.overlay = QLabel(self) # floats over the top right corner of the canvas, not part of the layout
+        self.overlay.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: white; padding: 4px; font-family: monospace;")
+        self.overlay.hide()
+
         self.array_size = 0 # stores the size of the array
         self.array_list = [] # stores the list of elements in the array
+        self.frame = [] # the array that is drawn, the events from the generator are applied to it
+        self.chart_title = "" # the title of the chart that is drawn
+        self.bar_colors = None # colour of every index of the chart, set for parallel sorts
 
-        self.timer = QTimer(self) # creates a timer
+        self.session = None # the run's session on the shared scheduler, replaced by the next run
         self.start_time = None # stores the start time of the animation
 
         self.generator = None # stores the generator that is used to generate the array
+        self.observed = None # the run's generator as handed to the observers (the algorithm's own one when none is ticked)
+        self.worker = None # the worker thread that steps the generator, when the check box is ticked
+        self.trace_reader = None # the trace file that is being replayed
+        self.counter = OperationCounter() # the work done by the run's algorithm
+        self.execution_times = {} # run title -> seconds, for the runs that finished
+        self.operation_counts = {} # run title -> the counters of that run, see counters.py
+        self.profiler = FrameProfiler() # the frame times of the run
+        self.timeline = None # every step of the run so far, for the slider and the step buttons
+        self.position = 0 # the step that is shown, less than timeline.steps after going back
+        self.sort_finished = False # True once the algorithm has no steps left
+        self.running_times_window = None # created the first time it is asked for
 
 # ---------------------- Helper Functions ----------------------
     def show_running_times(self):
-        self.running_times_window = RunningTimesWindow()
-        self.running_times_window.show()    
+        if self.running_times_window is None: # one window, clicking again brings it back instead of opening another
+            self.running_times_window = RunningTimesWindow()
+        self.running_times_window.show()
+        self.running_times_window.raise_()
     
+    def change_renderer(self, name): # puts the canvas that was picked in the combo box in place of the current one
+        if name == 'QPainter':
+            if self.painter_canvas is None:
+                self.painter_canvas = PainterBarCanvas()
+            canvas, renderer = self.painter_canvas, self.painter_canvas # the widget draws the bars itself
+        else:
+            canvas, renderer = self.matplotlib_canvas, self.matplotlib_renderer
+        if canvas is self.canvas:
+            return
+        self.layout.replaceWidget(self.canvas, canvas) # puts the new canvas where the old one was
+        self.canvas.hide()
+        canvas.show()
+        self.canvas, self.renderer = canvas, renderer
+        if len(self.frame): # a NumPy frame has no truth value
+            self.renderer.reset(self.frame, self.chart_title, colors=self.bar_colors) # keeps drawing the current run on the new canvas
+
+    def change_fps(self, fps): # changes how many frames are drawn per second
+        self.pacer.target_fps = fps
+        if self.session is not None:
+            self.session.set_interval(self.pacer.interval_ms())
+
+    def change_steps_per_second(self, steps): # changes how fast the algorithm runs, 0 is as fast as possible
+        self.pacer.steps_per_second = steps
+
     def generate_random_array(self): # generates a random array
         self.array_size = int(self.text_box.text()) # gets the text from the text box and converts it to an integer
-        self.array_list = [randint(0, 50) for _ in range(self.array_size)] # generates a list of random numbers with values between 0 and 50
+        self.array_list = random_array(self.array_size, 50, use_numpy=self.numpy_checkbox.isChecked()) # random numbers between 0 and 50, a list or a NumPy array
 
     def animate_sort(self): # function to animate the sorting
         self.generate_random_array() # generates a random array
 
-        sorting_algorithms = { # dictionary of sorting algorithms
-            'Insertion Sort': insertion_sort,
-            'Merge Sort': merge_sort,
-            'Quick Sort': quick_sort,
-        }
-
         algo_name = self.algorithm_combo.currentText() # gets the name of the sorting algorithm from the combo box
-        algorithm_func = sorting_algorithms[algo_name] # gets the function of the sorting algorithm from the dictionary
-        self.generator = algorithm_func(self.array_list.copy(), key=lambda x: x) # creates a generator for the sorting algorithm
-
-        self.figure.clear() # clears the figure
-        ax = self.figure.add_subplot(111) # adds a subplot to the figure
-        ax.set_xlabel('Algorithm')                          # sets the x-axis label.
-        ax.set_ylabel('Time (s)')                           # sets the y-axis label.
-        bars = ax.bar(range(len(self.array_list)), self.array_list, align="edge", width=0.8) # creates a bar chart with the array list as the height of the bars
-        ax.set_xlim(0, len(self.array_list)) # sets the x-axis limits
-        ax.set_ylim(0, int(1.1 * max(self.array_list))) # sets the y-axis limits
-        ax.set_title("Algorithm : " + algo_name ,
-                    fontdict={'fontsize': 12, 'fontweight': 'medium', 'color': '#E4365D'}) # sets the title of the chart
-        text = ax.text(0.01, 0.95, "", transform=ax.transAxes, color="#E4365D")
-        iteration = [0] # stores the number of iterations
+        algorithm_func = ALGORITHMS[algo_name].steps # gets the step version of the sorting algorithm from the registry
+        colors = None
+        regions = ALGORITHMS[algo_name].regions
+        if regions is not None: # a parallel sort, every worker's part of the array gets its own colour
+            colors = [None] * self.array_size
+            for w, (lo, hi) in enumerate(regions(self.array_size)):
+                colors[lo:hi] = [REGION_COLORS[w % len(REGION_COLORS)]] * (hi - lo)
+        self.start_animation(algorithm_func(self.array_list.copy()), "Algorithm : " + algo_name, colors) # creates a generator for the sorting algorithm
+
+    def record_run(self): # runs the chosen algorithm on a new array and saves the run to a trace file
+        path, _ = QFileDialog.getSaveFileName(self, "Record Trace", "", "Sorting traces (*.trace)")
+        if not path:
+            return
+        self.generate_random_array() # generates a random array
+        algo_name = self.algorithm_combo.currentText()
+        events = record_trace(path, ALGORITHMS[algo_name].steps, self.array_list) # swaps and writes, but also the depth and memory records
+        self.execution_time_label.setText(f"Recorded {events} events of {algo_name} to {path}")
+
+    def replay_run(self): # plays a trace file through the same animation as a live run
+        path, _ = QFileDialog.getOpenFileName(self, "Replay Trace", "", "Sorting traces (*.trace)")
+        if not path:
+            return
+        self.stop_worker() # the worker may still be reading the last trace
+        if self.trace_reader is not None: # the last replay's file and map are not needed anymore
+            self.trace_reader.close()
+        self.trace_reader = TraceReader(path) # kept open while its events are being read
+        self.array_list = self.trace_reader.initial()
+        self.array_size = len(self.array_list)
+        self.start_animation(self.trace_reader.events(), "Replay : " + path)
+
+    def start_animation(self, generator, title, colors=None): # animates the events of generator, starting from self.array_list
+        self.stop_worker() # the old run's thread must not keep stepping
+        self.timeline = Timeline(self.array_list) # records the steps as they are shown
+        self.counter = OperationCounter()
+        self.counters_label.setText(self.counter.summary())
+        self.profiler = FrameProfiler()
+        self.position = 0
+        self.sort_finished = False
+        self.close_run() # the last run's observers finish now, not whenever its generator is collected
+        generator = self.observed = observe(generator, self.observer_panel.make(), title) # the same generator when nothing is ticked
+        if self.thread_checkbox.isChecked():
+            self.generator = generator
+            self.worker = SortWorker(self.generator, counter=self.counter) # the worker owns the generator from now on, drain() records its changes
+            self.worker.start()
+        else:
+            self.generator = self.timeline.recording(generator) # records every step the generator makes
+        self.frame = self.array_list.copy() # the array that is drawn, the events from the generator are applied to it
+        self.chart_title = title
+        self.bar_colors = colors # colour of every index, None for the usual blue bars
+
+        self.renderer.reset(self.frame, self.chart_title, xlabel='Algorithm', ylabel='Time (s)', colors=self.bar_colors) # builds the bar chart once for this run
+        self.update_timeline_slider()
 
         self.start_time = QTime.currentTime() # get the current time
 
-        def animate(frame): # frame is the current state of the array
-            for rect, val in zip(bars, frame): # zip combines the two lists
-                rect.set_height(val) # set the height of the bar to the value of the current state of the array
-            iteration[0] += 1
-            text.set_text("iterations : {}".format(iteration[0]))
-            self.canvas.draw() # redraw the canvas
-
         def execution_time(): # function to get the execution time
-            try:
-                A = next(self.generator) # get the next state of the array
-                animate(A)
-            except StopIteration: # if the array is empty
-                self.timer.stop() # stop the timer
-                elapsed_time = self.start_time.elapsed() / 1000.0  # Convert to seconds
-                self.execution_time_label.setText(f"Total Execution Time: {elapsed_time:.6f} seconds")
-
-        self.timer.timeout.connect(execution_time) # connect the timer to the execution_time function
-        self.timer.start(50) # start the timer
+            self.profiler.start_frame()
+            if self.position < self.timeline.steps: # we went back on the timeline, play the recorded steps first
+                dirty, steps = self.replay_timeline()
+                finished = self.sort_finished and self.position + steps == self.timeline.steps
+            elif self.sort_finished: # resumed at the end of a finished run
+                dirty, steps, finished = set(), 0, True
+            elif self.worker is not None:
+                dirty, steps, finished = drain(self.worker, self.frame, self.pacer, record=self.timeline.record, profiler=self.profiler) # take the changes the worker has ready
+            else:
+                dirty, steps, finished = advance(self.generator, self.frame, self.pacer, self.counter, self.profiler) # do the steps that fit in this frame
+            if steps:
+                self.position += steps
+                self.show_position(dirty)
+            self.profiler.end_frame(steps)
+            if self.overlay.isVisible():
+                self.update_overlay()
+            if finished: # if the algorithm is done
+                self.session.pause() # no more frames until the user steps or seeks
+                if not self.sort_finished:
+                    self.sort_finished = True
+                    elapsed_time = self.start_time.elapsed() / 1000.0  # Convert to seconds
+                    totals = self.profiler.totals() # the wall time above is mostly the timer waiting, these are the parts of it that did work
+                    self.execution_time_label.setText(f"Total Execution Time: {elapsed_time:.6f} seconds "
+                                                      f"(algorithm {totals['step']:.6f} s, applying {totals['apply']:.6f} s, drawing {totals['draw']:.6f} s)")
+                    self.counters_label.setText(self.counter.summary())
+                    self.execution_times[self.chart_title] = elapsed_time
+                    self.operation_counts[self.chart_title] = self.counter.as_dict() # the work done, whatever the animation speed was
+                    self.observer_panel.show_reports()
+
+        self.pacer.start()
+        self.session = shared_scheduler().start(execution_time, self.pacer.interval_ms(), replacing=self.session) # the old run stops, every tick is one frame
+
+    def show_position(self, dirty): # draws the bars in dirty and moves the slider to self.position
+        started = time.perf_counter()
+        self.renderer.update(self.frame, dirty) # only the bars that changed are redrawn
+        self.renderer.set_text("iterations : {}".format(self.position))
+        drawn = time.perf_counter() - started
+        if self.canvas is self.painter_canvas: # QPainter paints later, when Qt gets to it, so the last paint is counted now
+            drawn += self.painter_canvas.paint_seconds
+            self.painter_canvas.paint_seconds = 0.0
+        self.profiler.add(DRAW, drawn)
+        self.counters_label.setText(self.counter.summary()) # the work done by the algorithm so far (ahead of the animation with a worker)
+        self.update_timeline_slider()
+
+    def update_timeline_slider(self): # the slider goes from the first step to the last one recorded
+        self.timeline_slider.blockSignals(True) # moving it here is not the user seeking
+        self.timeline_slider.setMaximum(self.timeline.steps if self.timeline else 0)
+        self.timeline_slider.setValue(self.position)
+        self.timeline_slider.blockSignals(False)
+
+    def replay_timeline(self): # plays the recorded steps of one frame after going back, returns (changed indices, steps)
+        quota = self.pacer.quota()
+        if quota is None: # as fast as possible, jump straight to the newest step
+            quota = self.timeline.steps
+        target = min(self.position + quota, self.timeline.steps)
+        steps = target - self.position
+        started = time.perf_counter()
+        if steps > 64: # a long way, rebuilding from a keyframe is quicker than applying every step
+            self.frame[:] = self.timeline.frame_at(target)
+            dirty = range(len(self.frame))
+        else:
+            dirty = self.timeline.apply(self.frame, self.position, target)
+        self.profiler.add(APPLY, time.perf_counter() - started)
+        return dirty, steps
+
+    def toggle_overlay(self, shown): # shows or hides the profiling overlay
+        self.overlay.setVisible(shown)
+        if shown:
+            self.update_overlay()
+
+    def update_overlay(self): # new numbers in the overlay, kept in the top right corner of the canvas
+        self.overlay.setText(self.profiler.overlay_text())
+        self.overlay.adjustSize()
+        corner = self.canvas.geometry().topRight()
+        self.overlay.move(corner.x() - self.overlay.width() - 10, corner.y() + 10)
+        self.overlay.raise_()
+
+    def export_profile(self): # saves the frame times of the last run to a JSON or CSV file
+        path, _ = QFileDialog.getSaveFileName(self, "Export Profile", "", "JSON (*.json);;CSV (*.csv)")
+        if path:
+            self.profiler.export(path)
+
+    def seek(self, step): # shows the array after the given step, pauses the animation
+        if self.timeline is None:
+            return
+        step = max(0, min(step, self.timeline.steps))
+        self.pause_animation() # scrubbing pauses, Resume goes on from the new position
+        if abs(step - self.position) <= 64: # a few steps, just apply or undo them
+            dirty = self.timeline.apply(self.frame, self.position, step)
+        else:
+            self.frame[:] = self.timeline.frame_at(step) # in place, the renderer keeps drawing the same list
+            dirty = range(len(self.frame))
+        self.position = step
+        self.show_position(dirty)
+
+    def step_back(self): # goes back one step
+        if self.timeline is not None and self.position > 0:
+            self.seek(self.position - 1)
+
+    def step_forward(self): # goes forward one step, running the algorithm if we are at the newest step
+        if self.timeline is None:
+            return
+        if self.position < self.timeline.steps:
+            return self.seek(self.position + 1)
+        self.pause_animation()
+        if self.sort_finished:
+            return
+        if self.worker is not None:
+            batch = self.worker.next_batch()
+            if not batch: # nothing ready yet, or the worker is done
+                self.sort_finished = self.worker.finished_sorting()
+                return
+            self.worker.pending = batch[1:]
+            self.timeline.record(batch[0])
+        else:
+            for event in self.generator: # the generator records the step for us
+                self.counter.count(event)
+                if event[0] == SWAP or event[0] == WRITE:
+                    break
+            else:
+                self.sort_finished = True
+                return
+        self.seek(self.timeline.steps)
+
+    def stop_worker(self): # stops the worker thread of the last run, if there is one
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+
+    def close_run(self): # closes the generator of the last run, so its observers are told it is over (tracemalloc stops)
+        if self.observed is not None:
+            self.observed.close()
+            self.observed = None
+
+    def closeEvent(self, event): # the worker thread has to stop before the window goes away
+        self.stop_worker()
+        self.close_run()
+        if self.session is not None: # the shared timer must not keep stepping a closed window
+            self.session.cancel()
+        super().closeEvent(event)
 
     def pause_animation(self): # function to pause the animation
-        self.timer.stop()
+        if self.session is not None:
+            self.session.pause()
 
     def resume_animation(self): # function to resume the animation
-        if self.generator:
-            self.timer.start(50)
+        if self.session is not None:
+            self.pacer.start() # the time spent paused doesn't count
+            self.session.start()
 
 # ---------------------- Main ----------------------
 # Existing main block...
@@ -0,0 +1,136 @@
+# Keeps a run's history so the animation can jump to any step and go backwards.
+#
+# Every change the algorithm makes is stored as writes (a swap is two writes):
+# the index, the new value and the old value, in compact typed arrays. Every
+# keyframe_interval writes a full copy of the array (a keyframe) is kept too.
+# To show step s, the closest keyframe or cached frame is copied and the writes
+# between it and s are applied forwards (new values) or backwards (old values).
+# With NumPy that is a few vectorized operations, so even a jump across a
+# million writes takes milliseconds. The last few frames that were rebuilt are
+# kept in an LRU cache, so scrubbing back and forth around one spot is free.
+#
+# Keyframes are at least n writes apart, so they never take more memory than the
+# writes themselves and the whole history stays O(steps).
+from array import array
+from collections import OrderedDict
+
+from algorithms import SWAP, WRITE
+
+try:
+    import numpy as np
+except ImportError: # everything still works without NumPy, seeking is just slower
+    np = None
+
+
+class Timeline:
+    def __init__(self, initial, keyframe_interval=None, cache_size=8):
+        self.numpy = np is not None and isinstance(initial, np.ndarray) # frames are given back as the same kind of array
+        self.dtype = initial.dtype if self.numpy else 'int64'
+        self.current = initial.tolist() if self.numpy else list(initial) # the array after the last recorded step
+        self.keyframe_interval = keyframe_interval or max(len(initial), 1 << 16)
+        self.keyframes = [array('q', initial)] # keyframes[k] is the array after k * keyframe_interval writes
+        self.indices = array('i') # one entry per write
+        self.new_values = array('q')
+        self.old_values = array('q')
+        self.offsets = array('q', [0]) # offsets[s] is the number of writes done by the first s steps
+        self.cache = OrderedDict() # step -> rebuilt frame, least recently used first
+        self.cache_size = cache_size
+
+    @property
+    def steps(self): # number of steps recorded so far
+        return len(self.offsets) - 1
+
+    def record(self, event): # adds one swap or write to the end of the history
+        op, a, b = event
+        current = self.current
+        if op == SWAP:
+            value_a, value_b = current[a], current[b]
+            self._write(a, value_b)
+            self._write(b, value_a)
+        elif op == WRITE:
+            self._write(a, b)
+        else:
+            return
+        self.offsets.append(len(self.indices))
+
+    def recording(self, generator): # passes the events of generator through and records them
+        for event in generator:
+            self.record(event)
+            yield event
+
+    def apply(self, frame, start, end): # moves frame from step start to step end (either way), returns the changed indices
+        w0, w1 = self.offsets[start], self.offsets[end]
+        dirty = set()
+        if w0 <= w1:
+            for w in range(w0, w1):
+                frame[self.indices[w]] = self.new_values[w]
+                dirty.add(self.indices[w])
+        else:
+            for w in range(w0 - 1, w1 - 1, -1): # undo the writes, newest first
+                frame[self.indices[w]] = self.old_values[w]
+                dirty.add(self.indices[w])
+        return dirty
+
+    def frame_at(self, step): # the whole array after step steps, as a new list (or NumPy array if the run started with one)
+        if step in self.cache:
+            self.cache.move_to_end(step)
+            return self._as_frame(self.cache[step])
+        target = self.offsets[step]
+
+        # start from the closest keyframe or cached frame
+        k = min(target // self.keyframe_interval, len(self.keyframes) - 1)
+        bases = [(k * self.keyframe_interval, self.keyframes[k])]
+        if k + 1 < len(self.keyframes):
+            bases.append(((k + 1) * self.keyframe_interval, self.keyframes[k + 1]))
+        bases += [(self.offsets[s], frame) for s, frame in self.cache.items()]
+        position, base = min(bases, key=lambda b: abs(b[0] - target))
+
+        if np is not None:
+            frame = np.array(base, dtype=self.dtype)
+            self._apply_vectorized(frame, position, target)
+        else:
+            frame = list(base)
+            if position <= target:
+                for w in range(position, target):
+                    frame[self.indices[w]] = self.new_values[w]
+            else:
+                for w in range(position - 1, target - 1, -1):
+                    frame[self.indices[w]] = self.old_values[w]
+
+        self.cache[step] = frame
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return self._as_frame(frame)
+
+    # ---------------------- Helper Functions ----------------------
+    def _as_frame(self, frame): # cached frames stay NumPy arrays, the viewers get what they started with
+        if np is None:
+            return list(frame)
+        return frame.copy() if self.numpy else frame.tolist()
+
+    def _write(self, index, value):
+        self.indices.append(index)
+        self.new_values.append(value)
+        self.old_values.append(self.current[index])
+        self.current[index] = value
+        if len(self.indices) % self.keyframe_interval == 0:
+            self.keyframes.append(array('q', self.current))
+
+    def _apply_vectorized(self, frame, start, end): # applies the writes between two write positions with NumPy
+        lo, hi = min(start, end), max(start, end)
+        if lo == hi:
+            return
+        indices = np.frombuffer(self.indices, dtype=np.int32)[lo:hi]
+        order = np.arange(hi - lo)
+        if start < end: # going forwards, the last write to an index wins
+            values = np.frombuffer(self.new_values, dtype=np.int64)[lo:hi]
+            pick = np.full(len(frame), -1)
+            np.maximum.at(pick, indices, order)
+            touched = pick >= 0
+        else: # going backwards, the old value of the first write to an index wins
+            values = np.frombuffer(self.old_values, dtype=np.int64)[lo:hi]
+            pick = np.full(len(frame), hi - lo)
+            np.minimum.at(pick, indices, order)
+            touched = pick < hi - lo
+        frame[touched] = values[pick[touched]]
+        del indices, values # let go of the buffers so the arrays can keep growing
@@ -1,100 +1,19 @@
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QLabel, QComboBox # importing PyQt5 modules. So we can use the GUI functionality of PyQt5.
 from PyQt5.QtCore import QTimer, QTime # This allows us to display the time in the GUI.
 from PyQt5.QtGui import QPalette, QColor # This allows us to change the background color of the GUI.
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas  # This allows us to display the figure in the GUI by using the canvas.
-from matplotlib.figure import Figure # FigureCanvasQTAgg is the canvas to display the figure.
 from random import randint # For generating a random array
 import sys # mporting the sys module.
 import random 
 
+from algorithms import insertion_sort, merge_sort, quick_sort, snapshots # the sorting algorithms, they don't load any GUI modules
 
 
-# ---------------------- Algorithms ----------------------
-def insertion_sort(arr, key=lambda x: x):
-    for i in range(1, len(arr)):
-        key_value = arr[i]
-        j = i - 1
-        while j >= 0 and key(arr[j]) > key_value:
-            arr[j + 1] = arr[j]
-            j -= 1
-        arr[j + 1] = key_value
-        yield arr.copy() # return the current state of the array
-
-
-def merge_sort(arr, key=lambda x: x):
-    if len(arr) > 1:
-        mid = len(arr) // 2
-        L, R = arr[:mid], arr[mid:]
-        yield from merge_sort(L, key) 
-        yield from merge_sort(R, key)
-
-        i = j = k = 0
-        while i < len(L) and j < len(R):
-            if key(L[i]) < key(R[j]):
-                arr[k] = L[i]
-                i += 1
-            else:
-                arr[k] = R[j]
-                j += 1
-            k += 1
-            yield arr.copy() # return the current state of the array
-
-        while i < len(L):
-            arr[k] = L[i]
-            i += 1
-            k += 1
-            yield arr.copy() # return the current state of the array
-
-        while j < len(R):
-            arr[k] = R[j]
-            j += 1
-            k += 1
-            yield arr.copy() # return the current state of the array
-
-def quick_sort(a, l=0, r=None, key=lambda x: x):
-    if r is None:
-        r = len(a) - 1
-    if l >= r:
-        return
-    x = a[l]
-    j = l
-    for i in range(l + 1, r + 1):
-        if key(a[i]) <= key(x):
-            j += 1
-            a[j], a[i] = a[i], a[j]
-        yield a
-    a[l], a[j]= a[j], a[l]
-    yield a
- 
-    # yield from statement used to yield 
-    # the array after dividing
-    yield from quick_sort(a, l, j-1)
-    yield from quick_sort(a, j + 1, r)
-"""def quick_sort(arr, low=0, high=None, key=lambda x: x):
-    if high is None:
-        high = len(arr) - 1
-    if high - low > 0:
-        pi = partition(arr, low, high, key)
-        yield from quick_sort(arr, low, pi - 1, key)
-        yield from quick_sort(arr, pi + 1, high, key)
-    yield arr
-
-def partition(arr, low, high, key):
-    pivot_index = random.randint(low, high)
-    arr[high], arr[pivot_index] = arr[pivot_index], arr[high]
-    pivot = arr[high]
-    i = low - 1
-    for j in range(low, high):
-        if key(arr[j]) <= key(pivot):
-            i = i + 1
-            arr[i], arr[j] = arr[j], arr[i]
-    arr[i + 1], arr[high] = arr[high], arr[i + 1]
-    return i + 1"""
-
 # ---------------------- GUI ----------------------
 class MainWindow(QWidget):  # creating a class that inherits from QWidget.
     def __init__(self):
         super().__init__()
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas # matplotlib is only loaded when a window is created,
+        from matplotlib.figure import Figure # so importing this module stays fast.
 
         self.layout = QVBoxLayout()                         # creates 'Window' for where GUI will be displayed.
 
@@ -134,7 +53,7 @@ class MainWindow(QWidget):  # creating a class that inherits from QWidget.
         if self.current_algorithm_index < len(self.sorting_algorithms):
             algo_name, algo_func = self.sorting_algorithms[self.current_algorithm_index]
             self.setWindowTitle(algo_name)  # set the window title to the name of the current sorting algorithm
-            self.generator = algo_func(self.array_list.copy(), key=lambda x: x)
+            self.generator = snapshots(algo_func, self.array_list.copy()) # the algorithms yield events, snapshots() turns them back into arrays
             self.figure.clear()                                 # clears the figure.
             # ... rest of the code to initialize the plot ...
             self.start_time = QTime.currentTime()
@@ -1,81 +1,24 @@
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QLabel, QComboBox # importing PyQt5 modules. So we can use the GUI functionality of PyQt5.
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit, QLabel, QComboBox, QSpinBox # importing PyQt5 modules. So we can use the GUI functionality of PyQt5.
 from PyQt5.QtCore import QTimer, QTime # This allows us to display the time in the GUI.
 from PyQt5.QtGui import QPalette, QColor # This allows us to change the background color of the GUI.
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas  # This allows us to display the figure in the GUI by using the canvas.
-from matplotlib.figure import Figure # FigureCanvasQTAgg is the canvas to display the figure.
 from random import randint # For generating a random array
 import sys # mporting the sys module.
 import random 
+import time
 
-
-
-# ---------------------- Algorithms ----------------------
-def insertion_sort(arr, key=lambda x: x):
-    for i in range(1, len(arr)):
-        key_value = arr[i]
-        j = i - 1
-        while j >= 0 and key(arr[j]) > key_value:
-            arr[j + 1] = arr[j]
-            j -= 1
-        arr[j + 1] = key_value
-        yield arr.copy() # return the current state of the array
-
-
-def merge_sort(arr, key=lambda x: x):
-    if len(arr) > 1:
-        mid = len(arr) // 2
-        L, R = arr[:mid], arr[mid:]
-        yield from merge_sort(L, key) 
-        yield from merge_sort(R, key)
-
-        i = j = k = 0
-        while i < len(L) and j < len(R):
-            if key(L[i]) < key(R[j]):
-                arr[k] = L[i]
-                i += 1
-            else:
-                arr[k] = R[j]
-                j += 1
-            k += 1
-            yield arr.copy() # return the current state of the array
-
-        while i < len(L):
-            arr[k] = L[i]
-            i += 1
-            k += 1
-            yield arr.copy() # return the current state of the array
-
-        while j < len(R):
-            arr[k] = R[j]
-            j += 1
-            k += 1
-            yield arr.copy() # return the current state of the array
-
-def quick_sort(a, l=0, r=None, key=lambda x: x):
-    if r is None:
-        r = len(a) - 1
-    if l >= r:
-        return
-    x = a[l]
-    j = l
-    for i in range(l + 1, r + 1):
-        if key(a[i]) <= key(x):
-            j += 1
-            a[j], a[i] = a[i], a[j]
-        yield a
-    a[l], a[j]= a[j], a[l]
-    yield a
- 
-    # yield from statement used to yield 
-    # the array after dividing
-    yield from quick_sort(a, l, j-1)
-    yield from quick_sort(a, j + 1, r)
+from algorithms import ALGORITHMS # the sorting algorithms, they yield small events instead of array copies
+from painter_canvas import PainterBarCanvas # draws the bars with QPainter, for very big arrays
+from pacing import FramePacer, FixedQuota, advance # does as many steps as fit in a frame, then draws once
+from counters import OperationCounter # counts comparisons, swaps, writes, extra memory and recursion depth
 
 
 # ---------------------- GUI ----------------------
 class MainWindow(QWidget):  # creating a class that inherits from QWidget.
     def __init__(self):
         super().__init__()
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas # matplotlib is only loaded when a window is created,
+        from matplotlib.figure import Figure # so importing this module (or the algorithms) stays fast.
+        from renderers import BlitBarRenderer, RaceRenderer # draws the bars once and then only redraws the ones that changed
 
         self.layout = QVBoxLayout()                         # creates 'Window' for where GUI will be displayed.
 
@@ -89,33 +32,103 @@ class MainWindow(QWidget):  # creating a class that inherits from QWidget.
         self.button.clicked.connect(self.animate_sort)   # connects the button to a function.
         self.layout.addWidget(self.button)                  # adds the button to the layout 'Window'.
 
+        self.race_button = QPushButton("Race All Algorithms") # creates a button to run every algorithm at the same time.
+        self.race_button.clicked.connect(self.animate_race) # connects the button to a function.
+        self.layout.addWidget(self.race_button)             # adds the button to the layout 'Window'.
+
+        self.renderer_combo = QComboBox()                   # creates a combo box for user to choose what draws the bars.
+        self.renderer_combo.addItems(['Matplotlib', 'QPainter']) # QPainter keeps up with much bigger arrays.
+        self.renderer_combo.currentTextChanged.connect(self.change_renderer) # swaps the canvas when the choice changes.
+        self.layout.addWidget(self.renderer_combo)          # adds the combo box to the layout 'Window'.
+
+        self.pacer = FramePacer(target_fps=30, steps_per_second=10) # 10 steps per second is how fast the old 100 ms timer went
+        pacing_layout = QHBoxLayout()                       # puts the pacing controls next to each other.
+        pacing_layout.addWidget(QLabel("Target FPS:"))
+        self.fps_box = QSpinBox()                           # creates a box for the number of frames drawn per second.
+        self.fps_box.setRange(1, 120)
+        self.fps_box.setValue(self.pacer.target_fps)
+        self.fps_box.valueChanged.connect(self.change_fps)  # connects the box to a function.
+        pacing_layout.addWidget(self.fps_box)
+        pacing_layout.addWidget(QLabel("Steps per second:"))
+        self.steps_box = QSpinBox()                         # creates a box for how many steps of the algorithm are done per second.
+        self.steps_box.setRange(0, 100000000)
+        self.steps_box.setSpecialValueText("As fast as possible") # shown for 0.
+        self.steps_box.setValue(self.pacer.steps_per_second)
+        self.steps_box.valueChanged.connect(self.change_steps_per_second) # connects the box to a function.
+        pacing_layout.addWidget(self.steps_box)
+        self.layout.addLayout(pacing_layout)                # adds the pacing controls to the layout 'Window'.
+
         self.execution_time_label = QLabel("Total Execution Time: ") # creates a label to display the total execution time.
         self.layout.addWidget(self.execution_time_label) # adds the label to the layout 'Window'.
 
+        self.counters_label = QLabel("")                    # creates a label to display the work the algorithm has done so far.
+        self.layout.addWidget(self.counters_label)          # adds the label to the layout 'Window'.
+
         self.figure = Figure()                              # creates a figure.
         self.canvas = FigureCanvas(self.figure)             # creates a canvas to display the figure.
         self.layout.addWidget(self.canvas)                  # adds the canvas to the layout 'Window'.
+        self.renderer = BlitBarRenderer(self.figure, self.canvas) # draws the bars of the array on the canvas.
+        self.matplotlib_canvas, self.matplotlib_renderer = self.canvas, self.renderer # kept so we can switch back to them
+        self.painter_canvas = None                          # created the first time QPainter is picked
+        self.race_renderer = RaceRenderer(self.figure, self.canvas) # draws every algorithm of a race in its own panel.
 
         self.setLayout(self.layout)                         # sets the layout of the window.               
 
         self.execution_times = {}
+        self.operation_counts = {}                          # algorithm name -> its counters, next to its execution time
+        self.counter = OperationCounter()
+        self.race = []                                      # one dict per algorithm while a race is running
+        self.finish_order = []                              # names of the algorithms of the last race, first one done first
+        self.race_quota = 256                               # steps per algorithm per frame when racing as fast as possible
 
         self.array_size = 0
         self.array_list = []
+        self.frame = []
         self.timer = QTimer(self)
+        self.timer.timeout.connect(self.execution_time)     # every tick of the timer is one frame.
         self.start_time = None
 
 # ---------------------- Helper Functions ----------------------
-    def animate(self, arr): # function to animate the sorting
-        self.figure.clear()                                 # clears the figure.
-        ax = self.figure.add_subplot(111)                   # adds a subplot to the figure.
-        ax.bar(range(len(arr)), arr, color='b')             # creates a bar chart with the array values.
-        self.canvas.draw()   
-    
+    def animate(self, dirty): # function to animate the sorting, dirty holds the indices that changed since the last frame
+        self.renderer.update(self.frame, dirty)             # only redraws the bars that changed.
+        self.counters_label.setText(self.counter.summary())
+
+    def change_fps(self, fps): # changes how many frames are drawn per second
+        self.pacer.target_fps = fps
+        self.timer.setInterval(self.pacer.interval_ms())
+
+    def change_steps_per_second(self, steps): # changes how fast the algorithm runs, 0 is as fast as possible
+        self.pacer.steps_per_second = steps
+
+
+    def change_renderer(self, name): # puts the canvas that was picked in the combo box in place of the current one
+        if self.race:                                       # the race panels are on the matplotlib figure, the choice is used by the next single run.
+            return
+        if name == 'QPainter':
+            if self.painter_canvas is None:
+                self.painter_canvas = PainterBarCanvas()
+            canvas, renderer = self.painter_canvas, self.painter_canvas # the widget draws the bars itself
+        else:
+            canvas, renderer = self.matplotlib_canvas, self.matplotlib_renderer
+        if canvas is self.canvas:
+            return
+        self.layout.replaceWidget(self.canvas, canvas)      # puts the new canvas where the old one was.
+        self.canvas.hide()
+        canvas.show()
+        self.canvas, self.renderer = canvas, renderer
+        if self.timer.isActive():
+            self.renderer.reset(self.frame, self.windowTitle()) # keeps drawing the current run on the new canvas.
 
     def display_execution_times_chart(self):
+        if self.canvas is not self.matplotlib_canvas:       # the chart needs the matplotlib figure.
+            self.layout.replaceWidget(self.canvas, self.matplotlib_canvas)
+            self.canvas.hide()
+            self.matplotlib_canvas.show()
+            self.canvas, self.renderer = self.matplotlib_canvas, self.matplotlib_renderer
+        self.renderer.detach() # the figure is used for the chart now, not the bars
+        self.race_renderer.detach()
         self.figure.clear()
-        ax = self.figure.add_subplot(111)
+        ax = self.figure.add_subplot(121)
 
         algorithms = list(self.execution_times.keys())
         times =[self.execution_times[algo] for algo in algorithms]
@@ -125,6 +138,19 @@ class MainWindow(QWidget):  # creating a class that inherits from QWidget.
         ax.set_title('Execution Times')
         ax.set_xlabel('Algorithm')
         ax.set_ylabel('Time (s)')
+
+        # the work each algorithm did, which doesn't depend on the animation speed
+        ops_ax = self.figure.add_subplot(122)
+        width = 0.25
+        for k, name in enumerate(['comparisons', 'swaps', 'writes']):
+            ops_ax.bar([i + (k - 1) * width for i in range(len(algorithms))],
+                       [self.operation_counts[algo][name] for algo in algorithms], width, label=name)
+        ops_ax.set_xticks(range(len(algorithms)))
+        ops_ax.set_xticklabels(["{}\ndepth {}, aux {}".format(algo, self.operation_counts[algo]['max_depth'], self.operation_counts[algo]['aux_memory'])
+                                for algo in algorithms], fontsize='small')
+        ops_ax.set_title('Operations')
+        ops_ax.legend(fontsize='small')
+        self.figure.tight_layout()
         self.canvas.draw()
 
     def generate_random_array(self): # generates a random array
@@ -133,25 +159,93 @@ class MainWindow(QWidget):  # creating a class that inherits from QWidget.
 
     def animate_sort(self):  # function to animate the sorting
         self.generate_random_array()  # generates a random array
+        self.race = []
+        self.renderer_combo.setEnabled(True)
 
-        self.sorting_algorithms = [
-            ('Insertion Sort', insertion_sort),
-            ('Merge Sort', merge_sort),
-            ('Quick Sort', quick_sort),
-        ]
+        self.sorting_algorithms = [(name, algorithm.steps) for name, algorithm in ALGORITHMS.items()] # every algorithm in the registry, one after another
         self.current_algorithm_index = -1
         self.execution_times.clear()  # clear previous execution times if any
+        self.operation_counts.clear()
         self.start_next_sort()
         
+    def animate_race(self): # runs every algorithm on the same array at the same time, each in its own panel
+        self.generate_random_array()
+        self.timer.stop()
+        self.execution_times.clear()
+        self.operation_counts.clear()
+        self.finish_order = []
+        self.race_quota = 256
+        self.race = [{'name': name, 'frame': self.array_list.copy(), 'generator': algorithm.steps(self.array_list.copy()),
+                      'counter': OperationCounter(), 'steps': 0, 'finished': False}
+                     for name, algorithm in ALGORITHMS.items()]
+        self.setWindowTitle("Race")
+        self.renderer_combo.setEnabled(False)               # the panels are always drawn with matplotlib.
+        if self.canvas is not self.matplotlib_canvas:       # the panels need the matplotlib figure.
+            self.layout.replaceWidget(self.canvas, self.matplotlib_canvas)
+            self.canvas.hide()
+            self.matplotlib_canvas.show()
+            self.canvas, self.renderer = self.matplotlib_canvas, self.matplotlib_renderer
+        self.renderer.detach() # the figure is split into the race panels now
+        self.race_renderer.reset([lane['frame'] for lane in self.race], [lane['name'] for lane in self.race])
+        self.start_time = QTime.currentTime()
+        self.pacer.start()
+        self.timer.start(self.pacer.interval_ms())
+
+    def race_step(self): # one frame of a race, every algorithm that isn't done gets the same number of steps
+        quota = self.pacer.quota()
+        if quota == 0:
+            return
+        adaptive = quota is None # as fast as possible, the quota follows how long the last frames took
+        lock_step = FixedQuota(self.race_quota if adaptive else quota)
+        started = time.perf_counter()
+        dirties = []
+        done_now = []
+        for lane in self.race:
+            if lane['finished']:
+                dirties.append(set())
+                continue
+            dirty, steps, finished = advance(lane['generator'], lane['frame'], lock_step, lane['counter'])
+            lane['steps'] += steps
+            dirties.append(dirty)
+            if finished:
+                done_now.append(lane)
+        for lane in sorted(done_now, key=lambda lane: lane['steps']): # finishing in the same frame, the one with fewer steps was first
+            lane['finished'] = True
+            self.finish_order.append(lane['name'])
+            self.execution_times[lane['name']] = self.start_time.elapsed() / 1000.0
+            self.operation_counts[lane['name']] = lane['counter'].as_dict()
+        if adaptive:
+            stepping = time.perf_counter() - started
+            frame_budget = self.pacer.budget / self.pacer.target_fps
+            if stepping < frame_budget / 2:
+                self.race_quota *= 2
+            elif stepping > frame_budget and self.race_quota > 1:
+                self.race_quota //= 2
+        texts = []
+        for lane in self.race:
+            if lane['finished']:
+                texts.append("#{} done in {:,} steps".format(self.finish_order.index(lane['name']) + 1, lane['steps']))
+            else:
+                texts.append("steps: {:,}".format(lane['steps']))
+        self.race_renderer.update([lane['frame'] for lane in self.race], dirties, texts) # every panel, one blit
+        self.counters_label.setText("\n".join("{}: {}".format(lane['name'], lane['counter'].summary()) for lane in self.race))
+        if all(lane['finished'] for lane in self.race):
+            self.timer.stop()
+            self.race = []
+            self.renderer_combo.setEnabled(True)
+            self.execution_time_label.setText("Finish order: " + ", ".join(self.finish_order))
+
     def execution_time(self):
-        try:
-            A = next(self.generator)
-            self.animate(A)
-        except StopIteration:
+        if self.race:
+            return self.race_step()
+        dirty, steps, finished = advance(self.generator, self.frame, self.pacer, self.counter) # applies the steps that fit in this frame to self.frame
+        if steps:
+            self.animate(dirty)
+        if finished:
             elapsed_time = self.start_time.elapsed() / 1000.0  # Convert to seconds
             algo_name, _ = self.sorting_algorithms[self.current_algorithm_index]
             self.execution_times[algo_name] = elapsed_time
-            self.timer.disconnect()  # disconnect the timer signal to prevent multiple calls.
+            self.operation_counts[algo_name] = self.counter.as_dict()
             self.start_next_sort() # start the first sorting algorithm
 
     def start_next_sort(self):
@@ -159,10 +253,15 @@ class MainWindow(QWidget):  # creating a class that inherits from QWidget.
         if self.current_algorithm_index < len(self.sorting_algorithms):
             algo_name, algo_func = self.sorting_algorithms[self.current_algorithm_index]
             self.setWindowTitle(algo_name)
+            self.frame = self.array_list.copy() # the array that is drawn, the events from the generator are applied to it
             self.generator = algo_func(self.array_list.copy())
+            self.counter = OperationCounter()               # every algorithm starts counting from zero
+            self.change_renderer(self.renderer_combo.currentText()) # the chart at the end may have swapped the canvas back
+            self.race_renderer.detach()                     # a race may have split the figure into panels
+            self.renderer.reset(self.frame, algo_name) # builds the bars once for this run
             self.start_time = QTime.currentTime()
-            self.timer.timeout.connect(self.execution_time)  # ensure connection is made here if not already connected
-            self.timer.start(100)  # consider using a shorter interval for smoother animation.
+            self.pacer.start()
+            self.timer.start(self.pacer.interval_ms())      # every tick of the timer is one frame.
         else:
             self.timer.stop()
             self.display_execution_times_chart()
@@ -0,0 +1,156 @@
+# Worker threads, so the windows stay responsive while an algorithm runs.
+#
+# SortWorker steps the generator, counts its events (see counters.py) and puts
+# the changes it makes into a bounded queue in batches. The GUI thread takes
+# them out with drain() on every frame, applies everything that is ready to its
+# own array and draws once, so the frames in between are dropped but no change
+# is lost. When the GUI falls behind (or is paused) the queue fills up and the
+# worker waits, so the memory used stays at max_batches * batch_size events
+# whatever the size of the array.
+#
+# SweepWorker times the algorithms over many array sizes for RunningTimesWindow
+# and sends every point to the window as soon as it is done. BenchmarkWorker
+# does the same with the trials of bench.benchmark() for its bar chart.
+from PyQt5.QtCore import QThread, pyqtSignal
+import queue
+import time
+
+from algorithms import SWAP, WRITE, COMPARE
+from bench import benchmark, sweep
+from counters import OperationCounter
+from pacing import apply_changes
+from profiling import STEP, APPLY
+
+
+class SortWorker(QThread):
+    def __init__(self, generator, batch_size=4096, max_batches=8, counter=None, parent=None):
+        super().__init__(parent)
+        self.generator = generator # the algorithm's generator, only used on the worker thread
+        self.counter = counter if counter is not None else OperationCounter() # counted on the worker thread, the GUI only reads it
+        self.batch_size = batch_size # events per batch
+        self.queue = queue.Queue(maxsize=max_batches) # batches waiting for the GUI
+        self.pending = [] # rest of a batch the GUI couldn't finish in the last frame
+        self.done = False # set by the worker when the generator ran out
+        self.stopped = False # set by the GUI to make the worker quit
+
+    def run(self): # runs on the worker thread
+        batch = []
+        flushed = time.perf_counter()
+        counts = self.counter.counts
+        for event in self.generator:
+            if self.stopped:
+                return
+            op = event[0]
+            counts[op] += 1
+            if op != SWAP and op != WRITE: # comparisons and the rest don't change the array, no need to send them
+                if op != COMPARE:
+                    self.counter.peak(op, event[1])
+                continue
+            batch.append(event)
+            if len(batch) >= self.batch_size or time.perf_counter() - flushed > 0.01: # slow steps still reach the GUI quickly
+                self._put(batch)
+                batch = []
+                flushed = time.perf_counter()
+        if batch:
+            self._put(batch)
+        self.done = True
+
+    def stop(self): # asks the worker to quit and waits for it
+        self.stopped = True
+        self.wait()
+
+    def finished_sorting(self): # True when every change has been handed to the GUI
+        return self.done and not self.pending and self.queue.empty()
+
+    def next_batch(self): # the next batch of changes, or None if nothing is ready yet (never blocks)
+        if self.pending:
+            batch, self.pending = self.pending, []
+            return batch
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    # ---------------------- Helper Functions ----------------------
+    def _put(self, batch): # waits for room in the queue, but gives up if the GUI stopped us
+        while not self.stopped:
+            try:
+                self.queue.put(batch, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+
+def drain(worker, frame, pacer, record=None, profiler=None): # like pacing.advance(), but takes the changes from a SortWorker
+    # record (e.g. Timeline.record) is called with every change, on the GUI thread
+    quota = pacer.quota()
+    dirty = set()
+    steps = 0
+    if quota == 0:
+        return dirty, steps, False
+    deadline = pacer.deadline()
+    while quota is None or steps < quota:
+        started = time.perf_counter()
+        batch = worker.next_batch()
+        if batch is None:
+            break
+        if quota is not None and steps + len(batch) > quota: # only part of this batch fits in the frame
+            worker.pending = batch[quota - steps:]
+            batch = batch[:quota - steps]
+        if record is not None:
+            for event in batch:
+                record(event)
+        taken = time.perf_counter()
+        dirty |= apply_changes(frame, batch)
+        steps += len(batch)
+        if profiler is not None: # the algorithm itself runs on the worker thread, stepping here is taking and recording batches
+            profiler.add(STEP, taken - started)
+            profiler.add(APPLY, time.perf_counter() - taken)
+        if time.perf_counter() > deadline:
+            break
+    return dirty, steps, worker.finished_sorting()
+
+
+class SweepWorker(QThread):
+    # runs bench.sweep() on its own thread, so the window can plot the points while the rest are timed
+    point_ready = pyqtSignal(str, int, float) # algorithm name, array size, seconds
+
+    def __init__(self, algorithms, sizes, make_array, cutoff=1.0, repeat=3, warmup=1, parent=None):
+        super().__init__(parent)
+        self.algorithms = algorithms # name -> fast function
+        self.sizes = sizes
+        self.make_array = make_array
+        self.cutoff = cutoff
+        self.repeat = repeat # timed runs per point, the median is sent
+        self.warmup = warmup
+        self.stopped = False
+
+    def run(self): # runs on the worker thread
+        for name, n, seconds in sweep(self.algorithms, self.sizes, self.make_array, cutoff=self.cutoff, repeat=self.repeat,
+                                     warmup=self.warmup, stopped=lambda: self.stopped):
+            self.point_ready.emit(name, n, seconds) # Qt delivers this on the GUI thread
+
+    def stop(self): # asks the worker to quit after the run it is timing and waits for it
+        self.stopped = True
+        self.wait()
+
+
+class BenchmarkWorker(QThread):
+    # runs bench.benchmark() on its own thread, so the window stays responsive while the trials are timed
+    result_ready = pyqtSignal(object) # one result dict of bench.benchmark()
+
+    def __init__(self, algorithms, sizes, distributions, parent=None, **options):
+        super().__init__(parent)
+        self.algorithms = algorithms # names in ALGORITHMS
+        self.sizes = sizes
+        self.distributions = distributions
+        self.options = options # trials, seed, observers... passed on to benchmark()
+        self.stopped = False
+
+    def run(self): # runs on the worker thread
+        for result in benchmark(self.algorithms, self.sizes, self.distributions, stopped=lambda: self.stopped, **self.options):
+            self.result_ready.emit(result) # Qt delivers this on the GUI thread
+
+    def stop(self): # asks the worker to quit after the trial it is timing and waits for it
+        self.stopped = True
+        self.wait()